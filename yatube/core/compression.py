@@ -0,0 +1,232 @@
+"""Сжатие ответов gzip или brotli, в том числе потоковых.
+
+Кодировка выбирается по Accept-Encoding (brotli - если установлен).
+Потоковые ответы, например ленты posts.feeds, сжимаются по кускам с
+flush после каждого, так что клиент получает данные по мере генерации;
+под ASGI синхронный поток читается асинхронно (core.streaming).
+Маленькие, уже сжатые и несжимаемые ответы идут как есть. Сэкономленные
+байты и время сжатия попадают в Server-Timing и гистограммы
+core.metrics.
+
+От BREACH, как и GZipMiddleware, защищает случайная длина: в заголовок
+gzip пишется имя файла из 1-COMPRESSION_MAX_RANDOM_BYTES случайных байт.
+brotli так дополнить нельзя, поэтому ответы с CSRF-токеном сжимаются
+только gzip.
+"""
+import re
+import secrets
+import struct
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+from .middleware import current_stats, route_name
+from .streaming import is_asgi, iterate_in_thread
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|javascript|xml|[\w.+-]+\+(json|xml))'
+    r'|image/svg\+xml)')
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        try:
+            if params.startswith('q=') and not float(params[2:]):
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def gzip_header(max_random_bytes):
+    """Заголовок gzip (RFC 1952) с именем файла случайной длины."""
+    if not max_random_bytes:
+        return b'\x1f\x8b\x08\x00' + bytes(4) + b'\x00\xff'
+    filename = secrets.token_bytes(secrets.randbelow(max_random_bytes) + 1)
+    return (b'\x1f\x8b\x08\x08' + bytes(4) + b'\x00\xff'
+            + filename.replace(b'\x00', b'') + b'\x00')
+
+
+class GzipStream:
+    encoding = 'gzip'
+
+    def __init__(self):
+        # Сырой deflate: заголовок и контрольную сумму gzip пишем сами,
+        # чтобы вставить случайное имя файла
+        self._compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._header = gzip_header(settings.COMPRESSION_MAX_RANDOM_BYTES)
+        self._crc = 0
+        self._size = 0
+
+    def _compress(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        compressed = self._header + self._compressor.compress(data)
+        self._header = b''
+        return compressed
+
+    def chunk(self, data):
+        return self._compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        return (self._compress(data) + self._compressor.flush()
+                + struct.pack('<II', self._crc, self._size & 0xffffffff))
+
+
+class BrotliStream:
+    encoding = 'br'
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data=b''):
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionStats:
+    """Байты и время сжатия одного ответа."""
+
+    def __init__(self, route, encoding):
+        self.route = route
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def run(self, compress, data):
+        started = time.perf_counter()
+        compressed = compress(data)
+        self.seconds += time.perf_counter() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def observe(self):
+        metrics.compression_saved_bytes.observe(
+            self.bytes_in - self.bytes_out, self.route, self.encoding)
+        metrics.compression_duration.observe(
+            self.seconds, self.route, self.encoding)
+
+
+class CompressionMiddleware:
+    """Ставить после PerformanceMiddleware: сжатие входит в замер."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def choose_stream(self, request, response):
+        accepted = accepted_encodings(request)
+        # CsrfViewMiddleware ставит куку, когда токен попал в ответ
+        has_csrf_token = settings.CSRF_COOKIE_NAME in response.cookies
+        if brotli is not None and 'br' in accepted and not has_csrf_token:
+            return BrotliStream
+        if 'gzip' in accepted:
+            return GzipStream
+        return None
+
+    def should_compress(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        if not COMPRESSIBLE_TYPES.match(content_type):
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+    def process_response(self, request, response):
+        # Vary нужен и несжатому ответу: кеши не должны отдать его
+        # клиенту, который ждёт сжатый, и наоборот
+        patch_vary_headers(response, ('Accept-Encoding',))
+        stream_class = self.choose_stream(request, response)
+        if stream_class is None or not self.should_compress(response):
+            return response
+        stream = stream_class()
+        stats = CompressionStats(route_name(request), stream.encoding)
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                request, response, stream, stats)
+            del response['Content-Length']
+        else:
+            body = stats.run(stream.finish, response.content)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+            self.record(stats)
+        response['Content-Encoding'] = stream.encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Байты ответа другие, поэтому ETag становится слабым
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def record(self, stats):
+        stats.observe()
+        request_stats = current_stats.get()
+        if request_stats is not None:
+            request_stats.compression = stats
+
+    def compress_stream(self, request, response, stream, stats):
+        # Поток читается уже после ответа middleware: итог идёт только
+        # в метрики
+        content = response.streaming_content
+        if not response.is_async and is_asgi(request):
+            # Иначе ASGI соберёт синхронный поток в память целиком
+            content = iterate_in_thread(content)
+        if response.is_async or is_asgi(request):
+            return self._compress_async(content, stream, stats)
+        return self._compress_sync(content, stream, stats)
+
+    def _compress_sync(self, content, stream, stats):
+        try:
+            for data in content:
+                if data:
+                    yield stats.run(stream.chunk, data)
+            yield stats.run(stream.finish, b'')
+        finally:
+            stats.observe()
+
+    async def _compress_async(self, content, stream, stats):
+        try:
+            async for data in content:
+                if data:
+                    yield stats.run(stream.chunk, data)
+            yield stats.run(stream.finish, b'')
+        finally:
+            stats.observe()
@@ -0,0 +1,53 @@
+"""Настройка подключений SQLite и повтор записей при блокировке базы."""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+# Так SQLite сообщает, что базу держит другой писатель
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA из settings.SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(error):
+    return any(message in str(error) for message in LOCK_MESSAGES)
+
+
+def retry_on_lock(func):
+    """Выполняет func в транзакции и повторяет её, если база занята.
+
+    busy_timeout не спасает, когда читающая транзакция SQLite пытается
+    стать пишущей, а снимок уже устарел: тогда помогает только повтор
+    всей транзакции. Внутри чужой транзакции повтор бессмысленен, и
+    func выполняется как есть.
+
+    Оборачивается только сама запись (save(), get_or_create()), а не
+    view: разбор формы, рендер и прочая работа запроса не повторяются.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if transaction.get_connection().in_atomic_block:
+            return func(*args, **kwargs)
+        attempts = settings.SQLITE_WRITE_RETRIES
+        for attempt in range(attempts + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == attempts or not is_lock_error(error):
+                    raise
+            # Экспоненциальная пауза со случайной добавкой, чтобы
+            # конкурирующие запросы не столкнулись снова
+            delay = settings.SQLITE_WRITE_RETRY_DELAY * 2 ** attempt
+            time.sleep(delay + random.uniform(0, delay))
+    return wrapper
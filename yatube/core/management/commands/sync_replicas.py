@@ -0,0 +1,41 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик '
+            '(settings.DATABASE_REPLICAS) через backup API')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'replicas', nargs='*',
+            help='какие реплики обновить, по умолчанию все')
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help='сколько страниц копировать за шаг; между шагами '
+                 'основная база доступна для записи')
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or settings.DATABASE_REPLICAS
+        unknown = set(replicas) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError(f'Это не реплики: {", ".join(sorted(unknown))}')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Копирование реплик поддерживается для SQLite')
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        try:
+            for alias in replicas:
+                # Подключение этого процесса к реплике увидело бы старый файл
+                connections[alias].close()
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    source.backup(target, pages=options['pages'])
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias}: обновлена'))
+        finally:
+            source.close()
@@ -0,0 +1,97 @@
+"""Гистограммы производительности запросов в памяти процесса.
+
+Каждый процесс сервера копит свои значения; Prometheus собирает их
+со всех процессов и складывает сам.
+"""
+import threading
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class Histogram:
+    """Гистограмма с метками в формате Prometheus."""
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(
+                label_values, [0] * len(self.buckets) + [0, 0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = {key: list(value) for key, value in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                labels = _format_labels(self.labels, label_values, le=bound)
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(self.labels, label_values, le='+Inf')
+            yield f'{self.name}_bucket{labels} {values[-2]}'
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_count{labels} {values[-2]}'
+            yield f'{self.name}_sum{labels} {values[-1]}'
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+REGISTRY = []
+
+request_duration = Histogram(
+    'yatube_request_duration_seconds',
+    'Полное время ответа', DURATION_BUCKETS, ('route', 'method'))
+db_duration = Histogram(
+    'yatube_db_duration_seconds',
+    'Время SQL-запросов за ответ', DURATION_BUCKETS, ('route',))
+db_queries = Histogram(
+    'yatube_db_queries',
+    'Число SQL-запросов за ответ', QUERY_BUCKETS, ('route',))
+template_duration = Histogram(
+    'yatube_template_duration_seconds',
+    'Время рендеринга шаблонов без SQL', DURATION_BUCKETS, ('route',))
+
+compression_saved_bytes = Histogram(
+    'yatube_compression_saved_bytes',
+    'Сколько байт ответа сэкономило сжатие', BYTES_BUCKETS,
+    ('route', 'encoding'))
+compression_duration = Histogram(
+    'yatube_compression_duration_seconds',
+    'Процессорное время сжатия ответа', DURATION_BUCKETS,
+    ('route', 'encoding'))
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = [line for metric in REGISTRY for line in metric.collect()]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,159 @@
+"""Замеры каждого запроса: SQL, шаблоны и полное время ответа.
+
+Статистика запроса лежит в contextvar, поэтому её видят и SQL из
+потоков sync_to_async асинхронных view. Итог уходит в заголовок
+Server-Timing и в гистограммы core.metrics. У потоковых ответов
+(ленты) замер в метриках включает SQL и время генерации тела.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import FileResponse
+
+from . import metrics
+
+current_stats = ContextVar('request_stats', default=None)
+_END = object()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        # core.compression.CompressionStats, если ответ сжат
+        self.compression = None
+
+
+def route_name(request):
+    match = request.resolver_match
+    return match.view_name if match else '<unresolved>'
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper для всех подключений к базе."""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class PerformanceMiddleware:
+    """Ставить первым в MIDDLEWARE, чтобы в замер попали остальные."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        response['Server-Timing'] = self.server_timing(stats)
+        route = route_name(request)
+        if response.streaming and not isinstance(response, FileResponse):
+            # Тело потокового ответа читается уже после middleware: SQL
+            # при его генерации считается, пока поток не закончится, и
+            # только тогда замер уходит в метрики. В Server-Timing,
+            # который отправляется до тела, его уже не видно.
+            measure = (self._measure_async if response.is_async
+                       else self._measure_sync)
+            response.streaming_content = measure(
+                response.streaming_content, stats, route, request.method)
+        else:
+            self.observe(stats, route, request.method)
+        return response
+
+    def _measure_sync(self, content, stats, route, method):
+        iterator = iter(content)
+        try:
+            while True:
+                token = current_stats.set(stats)
+                try:
+                    chunk = next(iterator, _END)
+                finally:
+                    current_stats.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            self.observe(stats, route, method)
+
+    async def _measure_async(self, content, stats, route, method):
+        iterator = aiter(content)
+        try:
+            while True:
+                token = current_stats.set(stats)
+                try:
+                    chunk = await anext(iterator, _END)
+                finally:
+                    current_stats.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            self.observe(stats, route, method)
+
+    def observe(self, stats, route, method):
+        total = time.perf_counter() - stats.started
+        metrics.request_duration.observe(total, route, method)
+        metrics.db_duration.observe(stats.db_seconds, route)
+        metrics.db_queries.observe(stats.queries, route)
+        metrics.template_duration.observe(stats.template_seconds, route)
+
+    def server_timing(self, stats):
+        total = time.perf_counter() - stats.started
+        timings = [
+            f'db;dur={stats.db_seconds * 1000:.2f};'
+            f'desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_seconds * 1000:.2f}',
+        ]
+        # app - время Python вне SQL, шаблонов и сжатия: view, пагинатор,
+        # middleware
+        app = total - stats.db_seconds - stats.template_seconds
+        compression = stats.compression
+        if compression is not None:
+            app -= compression.seconds
+            timings.append(
+                f'{compression.encoding};dur={compression.seconds * 1000:.2f};'
+                f'desc="saved {compression.bytes_in - compression.bytes_out}'
+                f' bytes"')
+        timings += [
+            f'app;dur={max(app, 0) * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        return ', '.join(timings)
@@ -0,0 +1,106 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики используются только внутри запросов, прошедших через
+PrimaryStickinessMiddleware: команды и фоновые задачи читают основную
+базу, потому что тут же пишут в неё. После записи пользователь какое-то
+время (REPLICA_STICKY_SECONDS) читает основную базу - так после
+редиректа он видит свой пост, даже если реплика ещё не догнала.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+ROUTED_APP_LABELS = {'posts', 'auth'}
+PRIMARY_COOKIE = 'use_primary'
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    def __init__(self, use_primary=False):
+        self.use_primary = use_primary
+        self.wrote = False
+
+
+def _routed(model):
+    return model._meta.app_label in ROUTED_APP_LABELS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (state is None or state.use_primary or state.wrote
+                or not replicas or not _routed(model)):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе Django записал бы объект туда, откуда его прочитал
+        state = _request_state.get()
+        if state is not None and _routed(model):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики - копии основной базы (см. sync_replicas)
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryStickinessMiddleware:
+    """Включает реплики для запроса и закрепляет писавших за основной."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(response, state)
+
+    def start(self, request):
+        until = request.get_signed_cookie(
+            PRIMARY_COOKIE, default=None, salt=PRIMARY_COOKIE)
+        return RequestState(
+            use_primary=until is not None and float(until) > time.time())
+
+    def finish(self, response, state):
+        if state.wrote:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_signed_cookie(
+                PRIMARY_COOKIE, str(time.time() + sticky),
+                salt=PRIMARY_COOKIE, max_age=sticky, httponly=True,
+                samesite='Lax')
+        return response
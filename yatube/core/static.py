@@ -0,0 +1,86 @@
+"""Раздача собранной статики (STATIC_ROOT) без веб-сервера перед Django.
+
+Файлы с хешем в имени не меняются, поэтому отдаются с годовым
+Cache-Control: immutable; браузер не перепроверяет их между страницами.
+Если клиент принимает br или gzip и рядом есть сжатая копия (см.
+core.storage), отдаётся она.
+"""
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+from .compression import accepted_encodings
+
+# Хеш, который ManifestStaticFilesStorage вставляет перед расширением
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Файлы без хеша могут поменяться при следующем collectstatic
+MUTABLE = 'public, max-age=60'
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFilesMiddleware:
+    """Ставить в начало MIDDLEWARE: статике не нужны сессии и кеш страниц."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG:
+            # В разработке статику отдаёт runserver прямо из исходников
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+    def serve(self, request):
+        if (not settings.STATIC_ROOT or request.method not in ('GET', 'HEAD')
+                or not request.path.startswith(settings.STATIC_URL)):
+            return None
+        name = request.path[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except (SuspiciousFileOperation, ValueError):
+            # Путь за пределами STATIC_ROOT: как и любой отсутствующий
+            # файл, достаётся обычной обработке и получает 404
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(request)
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, coding
+                break
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = (
+            IMMUTABLE if HASHED_NAME.search(name) else MUTABLE)
+        return response
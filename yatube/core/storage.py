@@ -0,0 +1,67 @@
+"""Статика с хешем в имени и заранее сжатыми копиями.
+
+collectstatic записывает файлы с хешем содержимого через manifest
+(шаблоны получают эти имена из {% static %}) и рядом кладёт сжатые
+копии .gz и .br. Их отдаёт core.static.StaticFilesMiddleware. Brotli -
+необязательная зависимость: без неё создаются только .gz.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Картинки и шрифты уже сжаты, повторное сжатие их не уменьшит
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.html', '.json', '.xml',
+}
+# Сжатая копия нужна, только если она заметно меньше исходника
+MIN_SAVING = 0.05
+
+
+def compressors():
+    yield 'gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield 'br', lambda data: brotli.compress(
+            data, quality=11, mode=brotli.MODE_TEXT)
+
+
+def _without_source_maps(patterns):
+    # bootstrap.min.css ссылается на .map, которого нет в static/
+    return tuple(
+        (extension, tuple(
+            pattern for pattern in extension_patterns
+            if 'sourceMappingURL' not in str(pattern)))
+        for extension, extension_patterns in patterns
+    )
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    patterns = _without_source_maps(ManifestStaticFilesStorage.patterns)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            yield from self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                continue
+            target = f'{name}.{suffix}'
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
+            yield name, target, True
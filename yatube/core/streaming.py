@@ -0,0 +1,47 @@
+"""Потоковые ответы под ASGI.
+
+StreamingHttpResponse в Django 4.2 под ASGI читает синхронный итератор
+через sync_to_async(list), то есть собирает весь ответ в памяти. Чтобы
+ленты и сжатие оставались потоковыми, синхронный итератор отдаётся
+асинхронным: куски берутся в потоке пачками по STREAM_BATCH_SIZE.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+STREAM_BATCH_SIZE = 64
+
+
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def iterate_in_thread(iterable, batch_size=STREAM_BATCH_SIZE):
+    """Асинхронный обход синхронного итератора, не больше batch_size
+    кусков за один переход в поток.
+
+    Переходы идут в общий поток запроса (thread_sensitive), поэтому
+    запросы к базе внутри итератора используют то же подключение.
+    """
+    iterator = iter(iterable)
+    take = sync_to_async(
+        lambda: list(islice(iterator, batch_size)), thread_sensitive=True)
+    try:
+        while True:
+            batch = await take()
+            if not batch:
+                return
+            for chunk in batch:
+                yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def stream_for(request, iterable):
+    """Содержимое StreamingHttpResponse: под ASGI - асинхронное."""
+    if is_asgi(request):
+        return iterate_in_thread(iterable)
+    return iterable
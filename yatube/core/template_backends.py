@@ -0,0 +1,34 @@
+"""Бэкенд шаблонов Django, который замеряет время рендеринга."""
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .middleware import current_stats
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        db_before = stats.db_seconds
+        try:
+            return super().render(context, request)
+        finally:
+            # Ленивые queryset выполняются при рендере: их время уже
+            # учтено как SQL
+            elapsed = time.perf_counter() - started
+            stats.template_seconds += elapsed - (stats.db_seconds - db_before)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
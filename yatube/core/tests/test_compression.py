@@ -0,0 +1,110 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from .. import metrics
+from ..compression import brotli
+
+User = get_user_model()
+
+
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        for i in range(20):
+            Post.objects.create(author=cls.user, text=f'Тестовый пост {i}')
+
+    def setUp(self):
+        cache.clear()
+        for metric in metrics.REGISTRY:
+            metric.clear()
+        self.guest_client = Client()
+
+    def test_html_is_gzipped(self):
+        """Страница сжимается gzip и распаковывается в тот же HTML"""
+        url = reverse('posts:index')
+        plain = self.guest_client.get(url).content
+        response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(gzip.decompress(response.content), plain)
+        self.assertLess(len(response.content), len(plain))
+        self.assertIn('gzip;dur=', response['Server-Timing'])
+
+    def test_brotli_is_preferred(self):
+        """brotli выбирается, если клиент его принимает"""
+        if brotli is None:
+            self.skipTest('brotli не установлен')
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Тестовый пост 19',
+                      brotli.decompress(response.content).decode())
+
+    def test_gzip_length_is_randomized(self):
+        """Длина gzip меняется от запроса к запросу (защита от BREACH)"""
+        url = reverse('posts:index')
+        plain = self.guest_client.get(url).content
+        bodies = [
+            self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip').content
+            for _ in range(5)
+        ]
+        self.assertTrue(all(body[3] & gzip.FNAME for body in bodies))
+        self.assertGreater(len({len(body) for body in bodies}), 1)
+        for body in bodies:
+            self.assertEqual(gzip.decompress(body), plain)
+
+    def test_csrf_token_is_not_brotli_compressed(self):
+        """Страница с CSRF-токеном сжимается только gzip"""
+        post = Post.objects.first()
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(
+            reverse('posts:post_detail', args=[post.pk]),
+            HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+
+    def test_refused_encoding_is_not_used(self):
+        """Кодировка с q=0 не используется"""
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_is_not_compressed(self):
+        """Ответ меньше COMPRESSION_MIN_SIZE идёт как есть"""
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    async def test_asgi_streaming_feed_is_compressed(self):
+        """Под ASGI потоковая лента сжимается асинхронным потоком"""
+        url = reverse('posts:index_feed', args=['rss'])
+        response = await AsyncClient().get(
+            url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'<rss', gzip.decompress(body))
+
+    def test_streaming_feed_is_compressed(self):
+        """Потоковая лента сжимается по кускам"""
+        url = reverse('posts:index_feed', args=['rss'])
+        plain = b''.join(self.guest_client.get(url).streaming_content)
+        response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), plain)
+        self.assertIn(
+            'yatube_compression_saved_bytes_count'
+            '{route="posts:index_feed",encoding="gzip"} 1',
+            metrics.render())
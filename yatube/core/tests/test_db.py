@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..db import apply_sqlite_pragmas, retry_on_lock
+
+
+class SqlitePragmasTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1000})
+    def test_pragmas_are_applied(self):
+        """PRAGMA из настроек применяются к подключению"""
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1000)
+
+
+@override_settings(SQLITE_WRITE_RETRIES=2, SQLITE_WRITE_RETRY_DELAY=0)
+class RetryOnLockTests(TransactionTestCase):
+    def test_locked_write_is_retried(self):
+        """Запись повторяется, пока база занята"""
+        write = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'saved'])
+        self.assertEqual(retry_on_lock(write)(), 'saved')
+        self.assertEqual(write.call_count, 2)
+
+    def test_retries_are_limited(self):
+        """После исчерпания попыток ошибка пробрасывается"""
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write)()
+        self.assertEqual(write.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки базы не повторяются"""
+        write = mock.Mock(side_effect=OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write)()
+        self.assertEqual(write.call_count, 1)
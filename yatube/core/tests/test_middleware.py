@@ -0,0 +1,69 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from .. import metrics
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.staff = User.objects.create_user(username='admin', is_staff=True)
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        for metric in metrics.REGISTRY:
+            metric.clear()
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_server_timing_header(self):
+        """Ответ несёт время SQL, шаблонов и полное время"""
+        response = self.guest_client.get(
+            reverse('posts:profile', args=['egor']))
+        timing = response['Server-Timing']
+        for name in ('db;dur=', 'tpl;dur=', 'app;dur=', 'total;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_metrics_are_staff_only(self):
+        """Метрики видит только персонал"""
+        url = reverse('core:metrics')
+        self.assertEqual(self.guest_client.get(url).status_code, 302)
+        self.guest_client.force_login(self.user)
+        self.assertEqual(self.guest_client.get(url).status_code, 302)
+        self.assertEqual(self.staff_client.get(url).status_code, 200)
+
+    def test_metrics_aggregate_by_route(self):
+        """Гистограммы собираются по имени маршрута"""
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        body = self.staff_client.get(reverse('core:metrics')).content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{route="posts:index",method="GET"} 2', body)
+        self.assertIn('yatube_db_queries_bucket{route="posts:index",', body)
+        self.assertIn(
+            'yatube_template_duration_seconds_sum{route="posts:index"}', body)
+
+    def test_streaming_queries_are_counted(self):
+        """SQL при генерации потокового ответа попадает в метрики"""
+        response = self.guest_client.get(
+            reverse('posts:index_feed', args=['rss']) + '?full=1')
+        before_body = int(re.search(
+            r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertNotIn('route="posts:index_feed"', metrics.render())
+        b''.join(response.streaming_content)
+        # Плюс выборка постов, которую делает уже поток
+        self.assertIn(
+            'yatube_db_queries_sum{route="posts:index_feed"} '
+            f'{float(before_body + 1)}', metrics.render())
@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..routers import (
+    PRIMARY_COOKIE, PrimaryStickinessMiddleware, ReplicaRouter,
+    RequestState, _request_state)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def in_request(self, state):
+        token = _request_state.set(state)
+        self.addCleanup(_request_state.reset, token)
+        return state
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые задачи читают основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_request_reads_use_replica_until_write(self):
+        """Запрос читает реплику, а после своей записи - основную базу"""
+        state = self.in_request(RequestState())
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertEqual(self.router.db_for_read(User), 'replica1')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertTrue(state.wrote)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_sticky_request_reads_primary(self):
+        """Закреплённый за основной базой запрос не читает реплику"""
+        self.in_request(RequestState(use_primary=True))
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        """Реплики не мигрируются: это копии основной базы"""
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class PrimaryStickinessMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_write_sets_sticky_cookie(self):
+        """После создания поста клиент закрепляется за основной базой"""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_cookie_pins_request_to_primary(self):
+        """Только подписанная кука включает чтение с основной базы"""
+        middleware = PrimaryStickinessMiddleware(lambda request: None)
+        request = RequestFactory().get('/')
+        request.COOKIES[PRIMARY_COOKIE] = str(time.time() + 60)
+        self.assertFalse(middleware.start(request).use_primary)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        request.COOKIES[PRIMARY_COOKIE] = response.cookies[
+            PRIMARY_COOKIE].value
+        self.assertTrue(middleware.start(request).use_primary)
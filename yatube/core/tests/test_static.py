@@ -0,0 +1,88 @@
+import gzip
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+from ..storage import brotli
+
+@override_settings(
+    STORAGES={
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {
+            'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage'},
+    },
+)
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STATIC_ROOT=static_root))
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     stdout=StringIO())
+
+    def setUp(self):
+        self.client = Client()
+        self.css = staticfiles_storage.url('css/bootstrap.min.css')
+
+    def test_templates_use_hashed_names(self):
+        """Шаблоны ссылаются на статику с хешем в имени"""
+        self.assertRegex(self.css, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertRegex(
+            staticfiles_storage.url('img/fav/favicon.ico'),
+            r'favicon\.[0-9a-f]{12}\.ico$')
+
+    def test_pages_link_hashed_assets(self):
+        """Страницы собираются с именами из manifest"""
+        response = self.client.get('/about/author/')
+        self.assertContains(response, self.css)
+
+    def test_hashed_file_is_immutable(self):
+        """Файл с хешем кешируется браузером навсегда"""
+        response = self.client.get(self.css)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_precompressed_copy_is_served(self):
+        """Клиенту с gzip отдаётся заранее сжатая копия"""
+        plain = b''.join(self.client.get(self.css).streaming_content)
+        response = self.client.get(self.css, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = b''.join(response.streaming_content)
+        self.assertLess(len(body), len(plain))
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_brotli_is_preferred(self):
+        """Если клиент принимает br, отдаётся brotli"""
+        if brotli is None:
+            self.skipTest('brotli не установлен')
+        response = self.client.get(
+            self.css, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        response.close()
+
+    def test_unhashed_name_is_revalidated(self):
+        """Файл без хеша кешируется ненадолго"""
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response.close()
+
+    def test_path_traversal_is_not_served(self):
+        """Файлы вне STATIC_ROOT не отдаются"""
+        for path in ('/static/../manage.py', '/static/%2e%2e/manage.py',
+                     '/static/css/../../manage.py'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
+                content = (b''.join(response.streaming_content)
+                           if response.streaming else response.content)
+                self.assertNotIn(b'DJANGO_SETTINGS_MODULE', content)
@@ -0,0 +1,12 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+from . import metrics as core_metrics
+
+
+@staff_member_required
+def metrics(request):
+    """Гистограммы запросов этого процесса для Prometheus."""
+    return HttpResponse(
+        core_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
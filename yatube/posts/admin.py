@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Post, Group
+from .models import Comment, Post, Group
+from .search import search_posts
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk','text', 'pub_date', 'author', 'group')
@@ -8,5 +9,21 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу FTS5 вместо LIKE '%...%' по всей таблице
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
\ No newline at end of file
+admin.site.register(Group)
+
+
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    # Без raw_id_fields форма грузила бы все посты в выпадающий список
+    raw_id_fields = ('post', 'author')
+    list_select_related = ('author',)
+
+
+admin.site.register(Comment, CommentAdmin)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""JSON API v1 только для чтения.
+
+Посты отдаются проекцией values() без создания моделей, ленты листаются
+курсором (pub_date, id). Поле count есть у всех лент; у главной это
+кешированное число постов, как у её пагинатора, и оно может отставать
+на POSTS_COUNT_CACHE_TIMEOUT секунд. Повторный опрос с If-None-Match или
+If-Modified-Since получает 304 до выборки постов.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import cache as posts_cache
+from . import lookups
+from .conditional import listing_validators, post_validators
+from .counters import (
+    author_posts_count, group_posts_count, index_posts_count)
+from .models import Post
+from .paginators import CursorPaginator
+
+API_PAGE_SIZE = 20
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+
+
+def _serialize(row):
+    return {name: row[field] for name, field in POST_FIELDS.items()}
+
+
+def _json(data, etag, last_modified=None):
+    response = JsonResponse(
+        data, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False})
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f'{request.path}?cursor={cursor}')
+
+
+def listing_response(request, queryset, scopes, count=None):
+    etag, last_modified = listing_validators(queryset, scopes, count=count)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+    rows = queryset.values(*POST_FIELDS.values())
+    page = CursorPaginator(rows, API_PAGE_SIZE).get_page(
+        request.GET.get('cursor'))
+    data = {
+        'count': count,
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+        'results': [_serialize(row) for row in page],
+    }
+    return _json(data, etag, last_modified)
+
+
+def post_list(request):
+    return listing_response(
+        request, Post.objects.all(), (posts_cache.INDEX, posts_cache.GROUPS),
+        count=index_posts_count(),
+    )
+
+
+def group_post_list(request, slug):
+    group = lookups.get_group_or_404(slug)
+    return listing_response(
+        request, group.posts.all(),
+        (posts_cache.group_scope(group.pk), posts_cache.GROUPS),
+        count=group_posts_count(group),
+    )
+
+
+def profile_post_list(request, username):
+    author = lookups.get_author_or_404(username)
+    return listing_response(
+        request, author.posts.all(),
+        (posts_cache.author_scope(author.pk), posts_cache.GROUPS),
+        count=author_posts_count(author),
+    )
+
+
+def post_detail(request, post_id):
+    etag, _ = post_validators(post_id)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+    row = get_object_or_404(
+        Post.objects.values(*POST_FIELDS.values()), pk=post_id)
+    return _json(_serialize(row), etag)
@@ -0,0 +1,105 @@
+"""Асинхронные версии view для чтения: лент, профиля и поста.
+
+Поиск объектов и проверка 304 идут через асинхронный ORM и кеш, так
+что медленный запрос к базе не занимает воркер целиком. Пагинация и
+рендер шаблонов остаются синхронными и выполняются в потоке через
+sync_to_async: под ASGI у каждого запроса свой поток, поэтому один
+процесс держит много медленных клиентов. Подключаются в posts/urls.py
+настройкой POSTS_ASYNC_VIEWS.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from . import cache as posts_cache
+from . import lookups
+from .conditional import (
+    aconditional_page, agroup_validators, aindex_validators,
+    apost_detail_validators, aprofile_validators)
+from .counters import (
+    INDEX_COUNT_KEY, aauthor_counts, aauthor_posts_count, agroup_posts_count,
+    estimate_posts_total)
+from .models import Post
+from .forms import CommentForm
+from .views import (
+    comments_page, follow_context, fragment_context, paginator_func)
+
+arender = sync_to_async(render)
+
+
+async def aget_object_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'{queryset.model._meta.object_name} не найден')
+
+
+@sync_to_async
+def render_listing(request, template, context, post_list, scopes,
+                   **paginate):
+    """Страница ленты: COUNT, выборка постов и рендер в одном потоке.
+
+    Посты выбираются лениво при рендере, поэтому при попадании в кеш
+    фрагмента запроса за ними не будет.
+    """
+    context = {
+        **context,
+        'page_obj': paginator_func(post_list, request, **paginate),
+        **fragment_context(request, *scopes),
+    }
+    return render(request, template, context)
+
+
+@aconditional_page(aindex_validators)
+async def index(request):
+    return await render_listing(
+        request, 'posts/index.html', {},
+        Post.objects.select_related('author', 'group'),
+        (posts_cache.INDEX, posts_cache.GROUPS),
+        count_key=INDEX_COUNT_KEY, count_estimate=estimate_posts_total,
+    )
+
+
+@aconditional_page(agroup_validators)
+async def group_posts(request, slug):
+    group = await lookups.aget_group_or_404(slug)
+    return await render_listing(
+        request, 'posts/group_list.html', {'group': group},
+        group.posts.select_related('author', 'group'),
+        (posts_cache.group_scope(group.pk),),
+        count=await agroup_posts_count(group),
+    )
+
+
+@aconditional_page(aprofile_validators)
+async def profile(request, username):
+    author = await lookups.aget_author_or_404(username)
+    posts_count, followers_count = await aauthor_counts(author)
+    context = {
+        'author': author,
+        'posts_count': posts_count,
+        **await sync_to_async(follow_context)(
+            request, author, followers_count),
+    }
+    return await render_listing(
+        request, 'posts/profile.html', context,
+        author.posts.select_related('author', 'group'),
+        (posts_cache.author_scope(author.pk), posts_cache.GROUPS),
+        count=posts_count,
+    )
+
+
+@aconditional_page(apost_detail_validators)
+async def post_detail(request, post_id):
+    post = await aget_object_or_404(
+        Post.objects.select_related('author__post_stats', 'group'),
+        pk=post_id
+    )
+    context = {
+        'post': post,
+        'posts_count': await aauthor_posts_count(post.author),
+        # Комментарии выбираются при рендере, в потоке arender
+        'comments': comments_page(post.pk),
+        'comment_form': CommentForm(),
+    }
+    return await arender(request, 'posts/post_detail.html', context)
@@ -0,0 +1,124 @@
+"""Версии кеша лент.
+
+Каждая лента кеширует отрендеренный фрагмент под ключом, в который
+входят версии её областей (scope): общая лента, группа, автор. Сигналы
+моделей увеличивают версии только затронутых областей, и старые
+фрагменты просто перестают запрашиваться.
+
+Версии лежат в базе (ScopeVersion), а не в кеше: кеш в памяти процесса
+не виден остальным воркерам, и они отдавали бы 304 и страницы из кеша
+по устаревшим версиям. Версия увеличивается в транзакции изменения и
+становится видна вместе с ним; читаются версии одним запросом по
+первичному ключу.
+"""
+import time
+
+from django.apps import apps
+from django.db import connections, router
+from django.utils import timezone
+
+INDEX = 'index'
+# Названия и slug групп выводятся в ссылках общей ленты и профиля
+GROUPS = 'groups'
+# Каталог групп: число постов и дата последнего меняются, только когда
+# пост появляется, переходит в другую группу или удаляется
+DIRECTORY = 'directory'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _model():
+    # models импортирует thumbnails, а тот - этот модуль
+    return apps.get_model('posts', 'ScopeVersion')
+
+
+def _initial_version():
+    # Новая область начинается не с нуля: после отката или пересоздания
+    # базы версии не совпадут с ключами, которые остались в кеше
+    return int(time.time() * 1000)
+
+
+def _rows(scopes):
+    return _model().objects.filter(scope__in=scopes).values_list(
+        'scope', 'version', 'changed')
+
+
+def _state(rows, scopes):
+    versions = {scope: version for scope, version, _ in rows}
+    stamps = [changed for _, _, changed in rows]
+    last_changed = int(max(stamps).timestamp()) if stamps else None
+    return [versions.get(scope, 0) for scope in scopes], last_changed
+
+
+def get_state(*scopes):
+    """Версии областей в том же порядке и время (timestamp) последнего
+    изменения любой из них; None, если области ещё не менялись."""
+    return _state(list(_rows(scopes)), scopes)
+
+
+async def aget_state(*scopes):
+    """get_state для асинхронных view."""
+    return _state([row async for row in _rows(scopes)], scopes)
+
+
+def get_versions(*scopes):
+    """Текущие версии областей в том же порядке."""
+    return get_state(*scopes)[0]
+
+
+async def aget_versions(*scopes):
+    """get_versions для асинхронных view."""
+    return (await aget_state(*scopes))[0]
+
+
+def bump(*scopes):
+    """Делает устаревшими все фрагменты с этими областями.
+
+    Все области обновляются одним INSERT ... ON CONFLICT: строка
+    новой области создаётся, у существующей версия растёт на единицу.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    model = _model()
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    scope, version, changed = (
+        quote(model._meta.get_field(name).column)
+        for name in ('scope', 'version', 'changed'))
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    initial = _initial_version()
+    rows = ', '.join(['(%s, %s, %s)'] * len(scopes))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({scope}, {version}, {changed}) '
+            f'VALUES {rows} ON CONFLICT ({scope}) DO UPDATE '
+            f'SET {version} = {table}.{version} + 1, '
+            f'{changed} = excluded.{changed}',
+            [value for name in scopes for value in (name, initial, now)]
+        )
+
+
+def fragment_key(request, *scopes):
+    """Ключ фрагмента ленты: версии областей и позиция на странице."""
+    if tuple(getattr(request, 'page_scopes', ())) == scopes:
+        # Валидаторы страницы уже прочитали эти версии
+        versions = request.page_versions
+    else:
+        versions = get_versions(*scopes)
+    versions = '.'.join(
+        f'{scope}={version}' for scope, version in zip(scopes, versions))
+    page = request.GET.get('page', '')
+    cursor = request.GET.get('cursor', '')
+    return f'{versions}|page={page}|cursor={cursor}'
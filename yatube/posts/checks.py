@@ -0,0 +1,21 @@
+"""Проверки настроек posts."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from users.checks import PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_lookup_cache(app_configs, **kwargs):
+    """Версии кеша поиска должны лежать в общем для процессов кеше."""
+    alias = settings.POSTS_LOOKUP_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is not None and backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'Кеш {alias!r} не общий для процессов: при нескольких воркерах '
+        f'posts.lookups отдаёт изменённые группы и авторов до '
+        f'POSTS_LOOKUP_TTL секунд',
+        hint='Укажите YATUBE_SHARED_CACHE=db или redis',
+        id='posts.W001',
+    )]
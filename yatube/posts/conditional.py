@@ -0,0 +1,216 @@
+"""Валидаторы для условных GET-запросов (ETag и Last-Modified).
+
+Валидаторы считаются дешевле самого ответа: для ленты это версии её
+областей кеша и последний пост, взятый по индексу с LIMIT 1, а для
+поста - только версии его областей. Last-Modified берётся из отметки
+последнего изменения областей, которую обновляют сохранения и удаления
+постов. Клиент, у которого ответ не устарел, получает 304 без выборки
+постов и рендеринга.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers, quote_etag)
+from django.utils.http import http_date
+
+from . import cache as posts_cache
+from . import directory, lookups
+from .models import Post
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def listing_validators(queryset, scopes, count=None, extra=()):
+    """ETag и Last-Modified (timestamp) ленты.
+
+    Last-Modified - отметка последнего изменения областей ленты, а не
+    дата свежего поста: правка и удаление не меняют pub_date.
+    """
+    last_id = queryset.order_by('-pub_date', '-id').values_list(
+        'id', flat=True).first()
+    versions, last_changed = posts_cache.get_state(*scopes)
+    etag = make_etag(*extra, last_id, count, *versions)
+    return etag, last_changed
+
+
+def post_validators(post_id, extra=()):
+    """ETag поста по версиям его областей, без выборки самого поста."""
+    versions = posts_cache.get_versions(
+        posts_cache.post_scope(post_id), posts_cache.GROUPS)
+    return make_etag(*extra, post_id, *versions), None
+
+
+def _user_key(request):
+    # Шапка страницы зависит от пользователя, поэтому он входит в ETag
+    return request.user.pk if request.user.is_authenticated else 'anon'
+
+
+def _remember_scopes(request, scopes, versions):
+    # Кеш страниц (posts.middleware) проверяет по ним свежесть ответа
+    request.page_scopes = scopes
+    request.page_versions = versions
+
+
+def _page_validators(request, scopes):
+    versions, last_changed = posts_cache.get_state(*scopes)
+    _remember_scopes(request, scopes, versions)
+    etag = make_etag(
+        'html', _user_key(request), request.get_full_path(), *versions)
+    return etag, last_changed
+
+
+async def _apage_validators(request, scopes):
+    # request.user ленивый: сессия и пользователь читаются синхронно
+    user = await sync_to_async(_user_key)(request)
+    versions, last_changed = await posts_cache.aget_state(*scopes)
+    _remember_scopes(request, scopes, versions)
+    etag = make_etag('html', user, request.get_full_path(), *versions)
+    return etag, last_changed
+
+
+def _index_scopes():
+    return posts_cache.INDEX, posts_cache.GROUPS
+
+
+def _group_scopes(group_id):
+    return posts_cache.group_scope(group_id),
+
+
+def _profile_scopes(author_id):
+    return posts_cache.author_scope(author_id), posts_cache.GROUPS
+
+
+def _post_detail_scopes(post_id, author_id):
+    # На странице поста есть число постов автора - нужна его область
+    return (
+        posts_cache.post_scope(post_id),
+        posts_cache.author_scope(author_id),
+        posts_cache.GROUPS,
+    )
+
+
+def _post_author_id(post_id):
+    return Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True)
+
+
+def directory_validators(request):
+    return _page_validators(request, directory.SCOPES)
+
+
+def comments_validators(request, post_id):
+    # Комментарии меняют только версию поста; база нужна лишь проверить,
+    # что пост есть. View фрагмента сам пост не читает, поэтому 404 - здесь
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    return _page_validators(request, (posts_cache.post_scope(post_id),))
+
+
+def index_validators(request):
+    return _page_validators(request, _index_scopes())
+
+
+def group_validators(request, slug):
+    group = lookups.get_group(slug)
+    if group is None:
+        return None, None
+    return _page_validators(request, _group_scopes(group.pk))
+
+
+def profile_validators(request, username):
+    author = lookups.get_author(username)
+    if author is None:
+        return None, None
+    return _page_validators(request, _profile_scopes(author.pk))
+
+
+def post_detail_validators(request, post_id):
+    author_id = _post_author_id(post_id).first()
+    if author_id is None:
+        return None, None
+    return _page_validators(
+        request, _post_detail_scopes(post_id, author_id))
+
+
+async def aindex_validators(request):
+    return await _apage_validators(request, _index_scopes())
+
+
+async def agroup_validators(request, slug):
+    group = await lookups.aget_group(slug)
+    if group is None:
+        return None, None
+    return await _apage_validators(request, _group_scopes(group.pk))
+
+
+async def aprofile_validators(request, username):
+    author = await lookups.aget_author(username)
+    if author is None:
+        return None, None
+    return await _apage_validators(request, _profile_scopes(author.pk))
+
+
+async def apost_detail_validators(request, post_id):
+    author_id = await _post_author_id(post_id).afirst()
+    if author_id is None:
+        return None, None
+    return await _apage_validators(
+        request, _post_detail_scopes(post_id, author_id))
+
+
+def _not_modified(request, etag, last_modified):
+    if etag is None:
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+
+
+def _set_validators(response, etag, last_modified):
+    if response.status_code == 200 and etag is not None:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_page(validators):
+    """Отвечает 304, если страница не менялась с прошлого запроса.
+
+    validators(request, *args, **kwargs) возвращает ETag и Last-Modified
+    (timestamp) или (None, None), если объекта нет - тогда решает view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag, last_modified = validators(request, *args, **kwargs)
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def aconditional_page(validators):
+    """conditional_page для асинхронных view и валидаторов."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            etag, last_modified = await validators(request, *args, **kwargs)
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            return _set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,182 @@
+"""Хранимые счётчики: посты у авторов и групп, подписчики у авторов и
+комментарии у постов.
+
+Счётчики меняются одним UPDATE ... SET posts_count = posts_count + N,
+поэтому параллельные публикации не теряют изменений. Если счётчики
+разошлись с данными (массовый update, загрузка в обход сигналов),
+их пересчитывает команда rebuild_post_counters.
+"""
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .paginators import cached_count
+
+# Ключ кешированного числа постов главной ленты
+INDEX_COUNT_KEY = 'posts:count:index'
+
+MISSING_STATS = object()
+
+
+def _change(queryset, delta, field='posts_count'):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _create_author_stats(author_id):
+    AuthorStats.objects.get_or_create(
+        author_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id).count(),
+        }
+    )
+
+
+def change_author_count(author_id, delta):
+    updated = _change(AuthorStats.objects.filter(author_id=author_id), delta)
+    if not updated and delta > 0:
+        # Первый пост автора: заводим счётчик по фактическим данным
+        _create_author_stats(author_id)
+
+
+def change_followers_count(author_id, delta):
+    updated = _change(
+        AuthorStats.objects.filter(author_id=author_id), delta,
+        'followers_count')
+    if not updated and delta > 0:
+        _create_author_stats(author_id)
+
+
+def change_group_count(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), delta)
+
+
+def change_comments_count(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), delta, 'comments_count')
+
+
+def recount_comments(post_ids):
+    """Пересчитывает комментарии постов после каскадного удаления."""
+    Post.objects.filter(pk__in=post_ids).update(
+        comments_count=_count_subquery('post', 'pk', Comment))
+
+
+def _loaded_stats(author):
+    # post_stats берётся, только если уже загружен select_related: объект
+    # из posts.lookups общий для запросов, дозагружать в него нельзя
+    if not User.post_stats.is_cached(author):
+        return MISSING_STATS
+    stats = getattr(author, 'post_stats', None)
+    return stats and (stats.posts_count, stats.followers_count)
+
+
+def _stats_query(author):
+    return AuthorStats.objects.filter(author_id=author.pk).values_list(
+        'posts_count', 'followers_count')
+
+
+def author_counts(author):
+    """Число постов и подписчиков автора.
+
+    Строки счётчика нет, пока у автора не было ни постов, ни подписчиков.
+    """
+    counts = _loaded_stats(author)
+    if counts is MISSING_STATS:
+        counts = _stats_query(author).first()
+    return counts or (author.posts.count(), 0)
+
+
+async def aauthor_counts(author):
+    """author_counts для асинхронных view."""
+    counts = _loaded_stats(author)
+    if counts is MISSING_STATS:
+        counts = await _stats_query(author).afirst()
+    return counts or (await author.posts.acount(), 0)
+
+
+def author_posts_count(author):
+    return author_counts(author)[0]
+
+
+async def aauthor_posts_count(author):
+    return (await aauthor_counts(author))[0]
+
+
+def _group_count_query(group):
+    return Group.objects.filter(pk=group.pk).values_list(
+        'posts_count', flat=True)
+
+
+def group_posts_count(group):
+    """Число постов группы из базы, а не из объекта кеша поиска."""
+    return _group_count_query(group).first() or 0
+
+
+async def agroup_posts_count(group):
+    return await _group_count_query(group).afirst() or 0
+
+
+def estimate_posts_total():
+    """Оценка числа постов по максимальному id: один шаг по индексу."""
+    return Post.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+
+def index_posts_count():
+    """Число постов главной ленты из кеша, как у её пагинатора."""
+    return cached_count(
+        INDEX_COUNT_KEY, Post.objects.count, estimate_posts_total)
+
+
+def _count_subquery(field, outer_field, model=Post):
+    rows = model.objects.filter(**{field: OuterRef(outer_field)}).order_by(
+        ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows[:1]), 0)
+
+
+def _create_missing_stats(users):
+    """Заводит AuthorStats авторам из users, у которых его ещё нет."""
+    # Exists вместо JOIN: каждый автор попадает в выборку один раз, и
+    # подзапросы-счётчики считаются для него тоже один раз
+    missing = users.filter(post_stats__isnull=True).filter(
+        Exists(Post.objects.filter(author=OuterRef('pk')))
+        | Exists(Follow.objects.filter(author=OuterRef('pk')))
+    ).annotate(
+        posts_total=_count_subquery('author', 'pk'),
+        followers_total=_count_subquery('author', 'pk', Follow),
+    ).values_list('pk', 'posts_total', 'followers_total')
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=pk, posts_count=posts, followers_count=followers)
+        for pk, posts, followers in missing
+    )
+
+
+def rebuild():
+    """Пересчитывает все счётчики по таблице постов."""
+    Group.objects.update(posts_count=_count_subquery('group', 'pk'))
+    Post.objects.update(
+        comments_count=_count_subquery('post', 'pk', Comment))
+    AuthorStats.objects.update(
+        posts_count=_count_subquery('author', 'author_id'),
+        followers_count=_count_subquery('author', 'author_id', Follow))
+    _create_missing_stats(User.objects.all())
+
+
+def recount_posts(author_ids=(), group_ids=(), chunk_size=500):
+    """Пересчитывает число постов только у перечисленных авторов и групп.
+
+    Для загрузок в обход сигналов: остальные строки не трогаются.
+    """
+    author_ids, group_ids = sorted(author_ids), sorted(group_ids)
+    for start in range(0, len(group_ids), chunk_size):
+        Group.objects.filter(
+            pk__in=group_ids[start:start + chunk_size]
+        ).update(posts_count=_count_subquery('group', 'pk'))
+    for start in range(0, len(author_ids), chunk_size):
+        chunk = author_ids[start:start + chunk_size]
+        AuthorStats.objects.filter(author_id__in=chunk).update(
+            posts_count=_count_subquery('author', 'author_id'))
+        _create_missing_stats(User.objects.filter(pk__in=chunk))
@@ -0,0 +1,43 @@
+"""Каталог групп с числом постов и датой последнего поста.
+
+Число постов берётся из хранимого Group.posts_count, дата последнего -
+подзапросом с LIMIT 1 по индексу постов группы, так что сборка не
+перебирает посты. Результат лежит в кеше под ключом из версий областей
+DIRECTORY и GROUPS: сигналы увеличивают их, когда пост создан,
+перенесён или удалён и когда меняется сама группа.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+
+from . import cache as posts_cache
+from .models import Group, Post
+
+SCOPES = (posts_cache.DIRECTORY, posts_cache.GROUPS)
+
+
+def _directory_key(versions):
+    return 'posts:directory:' + '.'.join(map(str, versions))
+
+
+def build_directory():
+    """Все группы по названию с числом постов и датой последнего."""
+    latest = Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date', '-id').values('pub_date')[:1]
+    return list(Group.objects.order_by('title', 'pk').values(
+        'title', 'slug', 'description',
+        total=F('posts_count'),
+        last_pub_date=Subquery(latest),
+    ))
+
+
+def group_directory(versions=None):
+    """Каталог из кеша; versions - уже прочитанные версии SCOPES."""
+    if versions is None:
+        versions = posts_cache.get_versions(*SCOPES)
+    key = _directory_key(versions)
+    directory = cache.get(key)
+    if directory is None:
+        directory = build_directory()
+        cache.set(key, directory, timeout=settings.POSTS_DIRECTORY_TIMEOUT)
+    return directory
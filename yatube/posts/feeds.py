@@ -0,0 +1,208 @@
+"""Ленты RSS, Atom и JSON Feed для главной, групп и профилей.
+
+Ответ собирается потоком из queryset.iterator(), поэтому даже полная
+история (?full=1) не загружается в память целиком; под ASGI поток
+отдаётся асинхронным итератором (core.streaming), иначе Django
+собрал бы его в список. ETag строится из
+версий кеша лент и последнего поста (см. posts.conditional), и
+агрегатор без изменений получает 304 без выборки постов.
+"""
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.http import http_date
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from core.streaming import stream_for
+
+from . import cache as posts_cache
+from . import lookups
+from .conditional import listing_validators
+from .models import Post
+
+FEED_LIMIT = 50
+FEED_CHUNK_SIZE = 500
+
+ITEM_FIELDS = (
+    'pk', 'text', 'pub_date', 'author__username', 'author__first_name',
+    'author__last_name', 'group__title',
+)
+
+
+class _Buffer(io.StringIO):
+    """Приёмник для SimplerXMLGenerator, который отдаёт текст кусками."""
+
+    def take(self):
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def _author_name(item):
+    full_name = f'{item["author__first_name"]} {item["author__last_name"]}'
+    return full_name.strip() or item['author__username']
+
+
+def _items(request, queryset):
+    for item in queryset.values(*ITEM_FIELDS).iterator(
+            chunk_size=FEED_CHUNK_SIZE):
+        item['link'] = request.build_absolute_uri(
+            reverse('posts:post_detail', args=[item['pk']]))
+        item['author_name'] = _author_name(item)
+        item['title'] = item['text'][:60]
+        yield item
+
+
+def rss(feed, items):
+    out = _Buffer()
+    xml = SimplerXMLGenerator(out, 'utf-8')
+    xml.startDocument()
+    xml.startElement('rss', {'version': '2.0'})
+    xml.startElement('channel', {})
+    xml.addQuickElement('title', feed['title'])
+    xml.addQuickElement('link', feed['link'])
+    xml.addQuickElement('description', feed['title'])
+    yield out.take()
+    for item in items:
+        xml.startElement('item', {})
+        xml.addQuickElement('title', item['title'])
+        xml.addQuickElement('link', item['link'])
+        xml.addQuickElement('guid', item['link'])
+        xml.addQuickElement('description', item['text'])
+        xml.addQuickElement('pubDate', rfc2822_date(item['pub_date']))
+        xml.addQuickElement('author', item['author_name'])
+        if item['group__title']:
+            xml.addQuickElement('category', item['group__title'])
+        xml.endElement('item')
+        yield out.take()
+    xml.endElement('channel')
+    xml.endElement('rss')
+    yield out.take()
+
+
+def atom(feed, items):
+    out = _Buffer()
+    xml = SimplerXMLGenerator(out, 'utf-8')
+    xml.startDocument()
+    xml.startElement('feed', {'xmlns': 'http://www.w3.org/2005/Atom'})
+    xml.addQuickElement('title', feed['title'])
+    xml.addQuickElement('link', '', {'href': feed['link']})
+    xml.addQuickElement('id', feed['link'])
+    xml.addQuickElement('updated', rfc3339_date(feed['updated']))
+    yield out.take()
+    for item in items:
+        xml.startElement('entry', {})
+        xml.addQuickElement('title', item['title'])
+        xml.addQuickElement('link', '', {'href': item['link']})
+        xml.addQuickElement('id', item['link'])
+        xml.addQuickElement('updated', rfc3339_date(item['pub_date']))
+        xml.startElement('author', {})
+        xml.addQuickElement('name', item['author_name'])
+        xml.endElement('author')
+        xml.addQuickElement('content', item['text'], {'type': 'text'})
+        xml.endElement('entry')
+        yield out.take()
+    xml.endElement('feed')
+    yield out.take()
+
+
+def json_feed(feed, items):
+    header = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': feed['title'],
+        'home_page_url': feed['link'],
+        'feed_url': feed['feed_url'],
+    }, ensure_ascii=False)
+    # Заголовок без закрывающей скобки: дальше потоком идёт массив items
+    yield header[:-1] + ', "items": ['
+    separator = ''
+    for item in items:
+        entry = {
+            'id': item['link'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_text': item['text'],
+            'date_published': rfc3339_date(item['pub_date']),
+            'authors': [{'name': item['author_name']}],
+        }
+        if item['group__title']:
+            entry['tags'] = [item['group__title']]
+        yield separator + json.dumps(entry, ensure_ascii=False)
+        separator = ', '
+    yield ']}'
+
+
+WRITERS = {
+    'rss': (rss, 'application/rss+xml; charset=utf-8'),
+    'atom': (atom, 'application/atom+xml; charset=utf-8'),
+    'json': (json_feed, 'application/feed+json; charset=utf-8'),
+}
+
+
+def feed_response(request, fmt, title, link, queryset, scopes):
+    """Потоковый ответ ленты с проверкой If-None-Match/If-Modified-Since."""
+    if fmt not in WRITERS:
+        raise Http404('Неизвестный формат ленты')
+    full = request.GET.get('full') == '1'
+    etag, last_modified = listing_validators(
+        queryset, scopes, extra=(fmt, full))
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+    if not full:
+        queryset = queryset[:FEED_LIMIT]
+    writer, content_type = WRITERS[fmt]
+    feed = {
+        'title': title,
+        'link': request.build_absolute_uri(link),
+        'feed_url': request.build_absolute_uri(),
+        'updated': datetime.fromtimestamp(last_modified, tz=dt_timezone.utc)
+        if last_modified is not None else timezone.now(),
+    }
+    response = StreamingHttpResponse(
+        stream_for(request, writer(feed, _items(request, queryset))),
+        content_type=content_type)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def index_feed(request, fmt):
+    return feed_response(
+        request, fmt,
+        title='Последние обновления на сайте',
+        link=reverse('posts:index'),
+        queryset=Post.objects.all(),
+        scopes=(posts_cache.INDEX, posts_cache.GROUPS),
+    )
+
+
+def group_feed(request, slug, fmt):
+    group = lookups.get_group_or_404(slug)
+    return feed_response(
+        request, fmt,
+        title=group.title,
+        link=reverse('posts:group_posts', args=[group.slug]),
+        queryset=group.posts.all(),
+        scopes=(posts_cache.group_scope(group.pk), posts_cache.GROUPS),
+    )
+
+
+def profile_feed(request, username, fmt):
+    author = lookups.get_author_or_404(username)
+    return feed_response(
+        request, fmt,
+        title=f'Посты пользователя {author.username}',
+        link=reverse('posts:profile', args=[author.username]),
+        queryset=author.posts.all(),
+        scopes=(posts_cache.author_scope(author.pk), posts_cache.GROUPS),
+    )
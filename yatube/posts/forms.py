@@ -1,17 +1,28 @@
 from django import forms
-from .models import Post
+from .models import Comment, Post
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
-        fields = ('text','group')
+        fields = ('text','group','image')
         labels = {
             'text': 'Текст поста',
             'group': 'Группа',
+            'image': 'Картинка',
         }
         help_texts = {
             'text': 'Текст нового поста',
             'group': 'Группа, к которой будет относиться пост',
+            'image': 'Картинка к посту',
         }
 
 
+
+
+class CommentForm(forms.ModelForm):
+    class Meta:
+        model = Comment
+        fields = ('text',)
+        labels = {
+            'text': 'Текст комментария',
+        }
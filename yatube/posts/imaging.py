@@ -0,0 +1,32 @@
+"""Уменьшенные копии картинок постов.
+
+render_thumbnail выполняется в процессах пула posts.thumbnails, поэтому
+модуль не импортирует Django: дочернему процессу не нужны настройки.
+"""
+import os
+
+from PIL import Image
+
+
+def fit(width, height, box):
+    """Размер картинки, вписанной в box без увеличения."""
+    box_width, box_height = box
+    scale = min(box_width / width, box_height / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render_thumbnail(source, target, box, quality):
+    """Записывает уменьшенную копию source в target в формате JPEG."""
+    with Image.open(source) as image:
+        size = fit(*image.size, box)
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft('RGB', size)
+        thumbnail = image.convert('RGB').resize(
+            size, Image.Resampling.LANCZOS)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Через временный файл, чтобы читатель не увидел недописанную копию
+    partial = f'{target}.{os.getpid()}.tmp'
+    thumbnail.save(partial, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    os.replace(partial, target)
+    return size
@@ -0,0 +1,268 @@
+"""Кеш поиска групп по slug и авторов по username в памяти процесса.
+
+Группы и пользователи меняются редко, а ищутся на каждой странице
+группы и профиля, в их лентах и API. Найденные объекты и промахи
+хранятся в LRU на POSTS_LOOKUP_SIZE записей: найденные - до
+POSTS_LOOKUP_TTL секунд, промахи - POSTS_LOOKUP_NEGATIVE_TTL, так что
+перебор несуществующих адресов не доходит до базы.
+
+В кеше только сами объекты: счётчики постов и подписчиков читаются
+отдельно (posts.counters) и записи не сбрасывают. Записи сбрасывают
+сохранение и удаление группы или пользователя. Для других процессов
+у каждой записи есть версии в общем кеше POSTS_LOOKUP_CACHE_ALIAS: по
+ключу поиска и, у найденных, по id. Сброс после коммита увеличивает
+обе, а поиск сверяет версии записи с общими и при расхождении читает
+базу заново; остальные записи вида не трогаются. Согласованность
+между процессами есть, только если этот кеш общий (см. posts.checks).
+
+Объекты из кеша общие для всех запросов процесса: их нельзя менять.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import Http404
+
+from .models import Group, User
+
+MISSING = object()
+
+
+def _shared():
+    return caches[settings.POSTS_LOOKUP_CACHE_ALIAS]
+
+
+def _version_keys(kind, key=None, pk=None):
+    keys = []
+    if key is not None:
+        keys.append(f'posts:lookups:{kind}:key:{key}')
+    if pk is not None:
+        keys.append(f'posts:lookups:{kind}:pk:{pk}')
+    return keys
+
+
+def _new_version():
+    # Не совпадает с версией, которая была у ключа до вытеснения
+    return time.time_ns()
+
+
+def _read_versions(keys):
+    shared = _shared()
+    versions = shared.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            shared.add(key, _new_version(), timeout=None)
+            versions[key] = shared.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+async def _aread_versions(keys):
+    shared = _shared()
+    versions = await shared.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await shared.aadd(key, _new_version(), timeout=None)
+            versions[key] = await shared.aget(key)
+    return tuple(versions[key] for key in keys)
+
+
+def _publish(keys):
+    """Увеличивает общие версии: записи с ними устаревают везде."""
+    shared = _shared()
+    for key in keys:
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, _new_version(), timeout=None)
+
+
+class LookupCache:
+    """LRU с TTL; значение None - запомненный промах."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        # key -> (истекает, значение, ключи версий, версии)
+        self._entries = OrderedDict()
+        self._keys_by_pk = {}
+        # Растёт при каждом сбросе: загрузка, начатая до сброса, не
+        # должна положить в кеш то, что уже устарело
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _checked(self, key, entry, versions):
+        if entry is None:
+            return MISSING
+        if versions != entry[3]:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._pop(key)
+            return MISSING
+        return entry[1]
+
+    def get(self, key):
+        entry = self._entry(key)
+        if entry is None:
+            return MISSING
+        return self._checked(key, entry, _read_versions(entry[2]))
+
+    async def aget(self, key):
+        entry = self._entry(key)
+        if entry is None:
+            return MISSING
+        return self._checked(key, entry, await _aread_versions(entry[2]))
+
+    def get_or_load(self, key, load):
+        value = self.get(key)
+        if value is MISSING:
+            generation = self._generation
+            # Версию ключа читаем до базы: сброс во время загрузки её
+            # изменит, и запись устареет
+            key_versions = _read_versions(_version_keys(self.kind, key))
+            value = load()
+            pk_versions = () if value is None else _read_versions(
+                _version_keys(self.kind, pk=value.pk))
+            self._store(key, value, generation, key_versions + pk_versions)
+        return value
+
+    async def aget_or_load(self, key, aload):
+        value = await self.aget(key)
+        if value is MISSING:
+            generation = self._generation
+            key_versions = await _aread_versions(
+                _version_keys(self.kind, key))
+            value = await aload()
+            pk_versions = () if value is None else await _aread_versions(
+                _version_keys(self.kind, pk=value.pk))
+            self._store(key, value, generation, key_versions + pk_versions)
+        return value
+
+    def _store(self, key, value, generation, versions):
+        ttl = (settings.POSTS_LOOKUP_TTL if value is not None
+               else settings.POSTS_LOOKUP_NEGATIVE_TTL)
+        version_keys = _version_keys(
+            self.kind, key, None if value is None else value.pk)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pop(key)
+            self._entries[key] = (
+                time.monotonic() + ttl, value, version_keys, versions)
+            if value is not None:
+                self._keys_by_pk[value.pk] = key
+            while len(self._entries) > settings.POSTS_LOOKUP_SIZE:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[1] is not None:
+            self._keys_by_pk.pop(entry[1].pk, None)
+
+    def delete(self, key=None, pk=None):
+        with self._lock:
+            self._generation += 1
+            if pk is not None:
+                self._pop(self._keys_by_pk.get(pk))
+            if key is not None:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_pk.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CACHES = {
+    'group': LookupCache('group'),
+    'user': LookupCache('user'),
+}
+
+
+def invalidate(kind, key=None, pk=None):
+    """Сбрасывает запись по ключу и/или id объекта во всех процессах."""
+    CACHES[kind].delete(key, pk)
+
+    def committed():
+        # До коммита другой поток или воркер мог снова прочитать старую
+        # строку, поэтому после коммита запись сбрасывается ещё раз
+        CACHES[kind].delete(key, pk)
+        _publish(_version_keys(kind, key, pk))
+
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(committed)
+    else:
+        _publish(_version_keys(kind, key, pk))
+
+
+def invalidate_all():
+    """Очищает кеш поиска этого процесса."""
+    for lookups in CACHES.values():
+        lookups.clear()
+
+
+def _group_query(slug):
+    return Group.objects.filter(slug=slug)
+
+
+def _author_query(username):
+    return User.objects.filter(username=username)
+
+
+def get_group(slug):
+    return CACHES['group'].get_or_load(
+        slug, lambda: _group_query(slug).first())
+
+
+async def aget_group(slug):
+    return await CACHES['group'].aget_or_load(
+        slug, _group_query(slug).afirst)
+
+
+def get_author(username):
+    return CACHES['user'].get_or_load(
+        username, lambda: _author_query(username).first())
+
+
+async def aget_author(username):
+    return await CACHES['user'].aget_or_load(
+        username, _author_query(username).afirst)
+
+
+def _or_404(value, name):
+    if value is None:
+        raise Http404(f'{name} не найден')
+    return value
+
+
+def get_group_or_404(slug):
+    return _or_404(get_group(slug), 'Group')
+
+
+def get_author_or_404(username):
+    return _or_404(get_author(username), 'User')
+
+
+async def aget_group_or_404(slug):
+    return _or_404(await aget_group(slug), 'Group')
+
+
+async def aget_author_or_404(username):
+    return _or_404(await aget_author(username), 'User')
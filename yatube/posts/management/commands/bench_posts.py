@@ -0,0 +1,288 @@
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from posts import counters
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from users import urls as users_urls
+
+ROUTE_MODULES = (posts_urls, users_urls)
+
+# Маршруты, после которых клиента нужно снова авторизовать
+RELOGIN_ROUTES = {'users:logout'}
+
+WORDS = (
+    'пост лента группа автор текст сегодня вчера новости город погода '
+    'книга фильм музыка спорт работа проект код база запрос страница'
+).split()
+
+
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    rank = max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def skewed_weights(size, skew):
+    """Веса по закону Ципфа: первые элементы встречаются чаще всего."""
+    return [1 / (rank + 1) ** skew for rank in range(size)]
+
+
+class SqlTimer:
+    """execute_wrapper, который считает запросы и время в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Заполняет временную базу и замеряет p50/p95/p99, число и время '
+            'SQL-запросов для каждого маршрута posts и users')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='показатель Ципфа для авторов и групп постов')
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='сколько замеров на маршрут')
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='сколько первых запросов не учитывать')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', default='bench_posts.json',
+            help='куда записать результаты в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого запуска для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='допустимый рост p95 в процентах')
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='рост p95 меньше этого считается шумом')
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='заполнять текущую базу, а не временную тестовую')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше нуля')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup не может быть отрицательным')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as source:
+                baseline = json.load(source)
+        old_name = None
+        if not options['current_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+        # Свой префикс ключей: кеш сайта и прошлых запусков не мешает
+        bench_cache = {
+            **settings.CACHES['default'],
+            'KEY_PREFIX': f'bench-{uuid.uuid4().hex}',
+        }
+        try:
+            with override_settings(
+                    CACHES={**settings.CACHES, 'default': bench_cache}):
+                dataset = self.seed(options)
+                routes = self.run(dataset, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        results = {
+            'dataset': {
+                name: options[name]
+                for name in ('users', 'groups', 'posts', 'skew', 'seed')
+            },
+            'requests': options['requests'],
+            'async_views': settings.POSTS_ASYNC_VIEWS,
+            'routes': routes,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+        self.report(routes, baseline)
+        if baseline is not None:
+            self.check_regressions(routes, baseline, options)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        if options['users'] < 1 or options['posts'] < 1:
+            raise CommandError('Нужен хотя бы один автор и один пост')
+        prefix = f'bench{uuid.uuid4().hex[:6]}'
+        with transaction.atomic():
+            User.objects.bulk_create(
+                User(username=f'{prefix}-user{i}', password='!')
+                for i in range(options['users']))
+            Group.objects.bulk_create(
+                Group(title=f'Группа {i}', slug=f'{prefix}-group{i}',
+                      description='Группа для замеров')
+                for i in range(options['groups']))
+            user_ids = list(User.objects.filter(
+                username__startswith=prefix).order_by('pk').values_list(
+                'pk', flat=True))
+            group_ids = list(Group.objects.filter(
+                slug__startswith=prefix).order_by('pk').values_list(
+                'pk', flat=True))
+            authors = rng.choices(
+                user_ids, skewed_weights(len(user_ids), options['skew']),
+                k=options['posts'])
+            now = timezone.now()
+            posts = []
+            for author_id in authors:
+                group_id = None
+                if group_ids and rng.random() < 0.7:
+                    group_id = rng.choices(group_ids, skewed_weights(
+                        len(group_ids), options['skew']))[0]
+                posts.append(Post(
+                    author_id=author_id,
+                    group_id=group_id,
+                    text=' '.join(rng.choices(WORDS, k=rng.randint(5, 80))),
+                    pub_date=now - timedelta(
+                        seconds=rng.randrange(365 * 24 * 3600)),
+                ))
+            Post.objects.bulk_create(posts, batch_size=1000)
+            # bulk_create идёт мимо сигналов
+            counters.rebuild()
+        author = User.objects.get(pk=user_ids[0])
+        group = Group.objects.filter(pk__in=group_ids[:1]).first()
+        post = author.posts.first() or Post.objects.first()
+        return {
+            'author': author,
+            'kwargs': {
+                'slug': group.slug if group else 'missing',
+                'username': author.username,
+                'post_id': post.pk,
+                'fmt': 'rss',
+                'uidb64': 'MQ',
+                'uibd64': 'MQ',
+                'token': 'set-password',
+            },
+        }
+
+    def route_urls(self, kwargs):
+        for module in ROUTE_MODULES:
+            for pattern in module.urlpatterns:
+                if not isinstance(pattern, URLPattern) or not pattern.name:
+                    continue
+                name = f'{module.app_name}:{pattern.name}'
+                params = pattern.pattern.converters.keys()
+                yield name, reverse(
+                    name, kwargs={param: kwargs[param] for param in params})
+
+    def client(self, author):
+        client = Client(raise_request_exception=False)
+        client.force_login(author)
+        return client
+
+    def measure(self, client, url):
+        timer = SqlTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        response.close()
+        return response.status_code, elapsed, timer
+
+    def run(self, dataset, options):
+        author = dataset['author']
+        routes = {}
+        # Ответы 500 попадают в отчёт кодом, трассировки в лог не нужны
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for name, url in self.route_urls(dataset['kwargs']):
+                routes[name] = self.run_route(author, name, url, options)
+        finally:
+            request_logger.setLevel(level)
+        return routes
+
+    def run_route(self, author, name, url, options):
+        client = self.client(author)
+        timings, queries, sql_seconds = [], [], []
+        status = None
+        for attempt in range(options['warmup'] + options['requests']):
+            status, elapsed, timer = self.measure(client, url)
+            if name in RELOGIN_ROUTES:
+                client.force_login(author)
+            if attempt < options['warmup']:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(timer.count)
+            sql_seconds.append(timer.seconds)
+        timings.sort()
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'queries': max(queries),
+            'sql_ms': round(sum(sql_seconds) / len(sql_seconds) * 1000, 3),
+        }
+
+    def report(self, routes, baseline):
+        base_routes = baseline['routes'] if baseline else {}
+        self.stdout.write(
+            f'{"маршрут":<32} {"код":>4} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"SQL":>4} {"SQL мс":>8}')
+        for name, row in routes.items():
+            line = (
+                f'{name:<32} {row["status"]:>4} {row["p50_ms"]:>8.2f} '
+                f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} '
+                f'{row["queries"]:>4} {row["sql_ms"]:>8.2f}'
+            )
+            base = base_routes.get(name)
+            if base is not None and base['p95_ms']:
+                change = (row['p95_ms'] / base['p95_ms'] - 1) * 100
+                line += f'  p95 {change:+.0f}%'
+            self.stdout.write(line)
+
+    def check_regressions(self, routes, baseline, options):
+        regressions = []
+        for name, base in baseline['routes'].items():
+            row = routes.get(name)
+            if row is None:
+                continue
+            limit = base['p95_ms'] * (1 + options['threshold'] / 100)
+            if (row['p95_ms'] > limit and row['p95_ms'] - base['p95_ms']
+                    > options['min_delta_ms']):
+                regressions.append(
+                    f'{name}: p95 {base["p95_ms"]:.2f} -> '
+                    f'{row["p95_ms"]:.2f} мс')
+            if row['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {base["queries"]} -> '
+                    f'{row["queries"]}')
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.paginators import BACKWARD, FORWARD, CursorPaginator
+from posts.views import POSTS_PER_PAGE
+
+# Признаки полной сортировки выборки в планах разных СУБД
+SORT_MARKERS = (
+    'USE TEMP B-TREE FOR ORDER BY',  # SQLite
+    'Sort Key',                      # PostgreSQL
+    'Using filesort',                # MySQL
+    'SORT ORDER BY',                 # Oracle
+)
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы запросов, которые выполняют ленты posts.views'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group', help='slug группы (по умолчанию первая в БД)')
+        parser.add_argument(
+            '--username', help='автор профиля (по умолчанию первый в БД)')
+        parser.add_argument(
+            '--fail-on-sort', action='store_true',
+            help='завершиться с ошибкой, если лента сортирует всю выборку'
+        )
+
+    def listings(self, options):
+        """Ленты в том виде, в каком их строят представления."""
+        listings = {'index': Post.objects.select_related('author', 'group')}
+        groups = Group.objects.order_by('pk')
+        if options['group']:
+            groups = groups.filter(slug=options['group'])
+        group = groups.first()
+        if group is not None:
+            listings['group_posts'] = group.posts.select_related(
+                'author', 'group')
+        authors = User.objects.order_by('pk')
+        if options['username']:
+            authors = authors.filter(username=options['username'])
+        author = authors.first()
+        if author is not None:
+            listings['profile'] = author.posts.select_related(
+                'author', 'group')
+        return listings
+
+    def queries(self, listings):
+        now = timezone.now()
+        for name, queryset in listings.items():
+            paginator = CursorPaginator(queryset, POSTS_PER_PAGE)
+            yield f'{name}: страница 1', queryset[:POSTS_PER_PAGE]
+            yield f'{name}: страница 100', queryset[
+                POSTS_PER_PAGE * 99:POSTS_PER_PAGE * 100]
+            yield f'{name}: курсор вперёд', paginator.page_queryset(
+                (FORWARD, now, 0))
+            yield f'{name}: курсор назад', paginator.page_queryset(
+                (BACKWARD, now, 0))
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'СУБД: {connection.vendor}')
+        sorting = []
+        for title, queryset in self.queries(self.listings(options)):
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(plan)
+            if any(marker in plan for marker in SORT_MARKERS):
+                sorting.append(title)
+                self.stdout.write(
+                    self.style.WARNING('  сортировка всей выборки'))
+        if not sorting:
+            self.stdout.write(self.style.SUCCESS('Все ленты идут по индексу'))
+        elif options['fail_on_sort']:
+            raise CommandError('Сортируют всю выборку: ' + ', '.join(sorting))
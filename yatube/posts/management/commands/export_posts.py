@@ -0,0 +1,82 @@
+import json
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Group, Post, User
+
+USER_FIELDS = (
+    'username', 'first_name', 'last_name', 'email', 'password',
+    'is_active', 'date_joined',
+)
+GROUP_FIELDS = ('slug', 'title', 'description')
+
+
+def _json_default(value):
+    # Даты с микросекундами: от них зависит порядок постов в лентах
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы и посты в JSON Lines '
+            'потоком, не загружая таблицы в память')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='как часто (в строках) печатать прогресс')
+
+    def rows(self, batch_size):
+        users = User.objects.order_by('pk').values(*USER_FIELDS)
+        for row in users.iterator(chunk_size=batch_size):
+            yield {'model': 'user', **row}
+        groups = Group.objects.order_by('pk').values(*GROUP_FIELDS)
+        for row in groups.iterator(chunk_size=batch_size):
+            yield {'model': 'group', **row}
+        posts = Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'pub_date', 'text')
+        for author, group, pub_date, text in posts.iterator(
+                chunk_size=batch_size):
+            yield {
+                'model': 'post',
+                'author': author,
+                'group': group,
+                'pub_date': pub_date,
+                'text': text,
+            }
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            output = self.stdout
+        else:
+            output = open(options['path'], 'w', encoding='utf-8')
+        started = time.monotonic()
+        written = 0
+        try:
+            for row in self.rows(options['batch_size']):
+                output.write(json.dumps(
+                    row, ensure_ascii=False, default=_json_default) + '\n')
+                written += 1
+                if written % options['progress_every'] == 0:
+                    self.report(written, started)
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.report(written, started, final=True)
+
+    def report(self, written, started, final=False):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        message = (f'Выгружено строк: {written} за {elapsed:.1f} с '
+                   f'({written / elapsed:.0f} строк/с)')
+        # Прогресс идёт в stderr, чтобы не смешиваться с выгрузкой в stdout
+        if final:
+            self.stderr.write(self.style.SUCCESS(message))
+        else:
+            self.stderr.write(message)
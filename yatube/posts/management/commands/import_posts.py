@@ -0,0 +1,217 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from posts import cache as posts_cache
+from posts import counters, search
+from posts.models import Group, Post, User
+
+USER_FIELDS = (
+    'username', 'first_name', 'last_name', 'email', 'password', 'is_active',
+)
+IMPORTED_FIELDS = ('text', 'pub_date', 'author', 'group')
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы и посты из JSON Lines '
+            '(см. export_posts) пачками по --batch-size строк')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='файл с выгрузкой, по умолчанию stdin')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='сколько строк вставлять за один запрос')
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='как часто (в строках) печатать прогресс')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        self.buffers = {'user': [], 'group': [], 'post': []}
+        self.stats = {'user': 0, 'group': 0, 'post': 0, 'skipped': 0}
+        self.authors, self.groups = set(), set()
+        if options['path'] == '-':
+            source = sys.stdin
+        else:
+            source = open(options['path'], encoding='utf-8')
+        started = time.monotonic()
+        read = 0
+        try:
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                self.add(line_number, line)
+                read += 1
+                if read % options['progress_every'] == 0:
+                    self.report(read, started)
+            self.flush_all()
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.finish()
+        self.report(read, started, final=True)
+
+    def add(self, line_number, line):
+        try:
+            row = json.loads(line)
+            model = row.pop('model')
+        except (ValueError, KeyError):
+            raise CommandError(f'Строка {line_number}: не JSON выгрузки')
+        if model not in self.buffers:
+            raise CommandError(f'Строка {line_number}: модель {model}?')
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            if model == 'post':
+                # Авторы и группы из буфера нужны постам уже в базе
+                self.flush_users()
+                self.flush_groups()
+                self.flush_posts()
+            else:
+                getattr(self, f'flush_{model}s')()
+
+    def flush_all(self):
+        self.flush_users()
+        self.flush_groups()
+        self.flush_posts()
+
+    def flush_users(self):
+        rows, self.buffers['user'] = self.buffers['user'], []
+        if not rows:
+            return
+        existing = set(User.objects.filter(
+            username__in={row['username'] for row in rows}
+        ).values_list('username', flat=True))
+        users = {}
+        for row in rows:
+            if row['username'] in existing:
+                continue
+            user = User(**{
+                field: row[field] for field in USER_FIELDS if field in row})
+            if row.get('date_joined'):
+                user.date_joined = parse_datetime(row['date_joined'])
+            users.setdefault(user.username, user)
+        with transaction.atomic():
+            User.objects.bulk_create(users.values(), ignore_conflicts=True)
+        # Уже существующие и повторные строки не считаются загруженными
+        self.stats['user'] += len(users)
+
+    def flush_groups(self):
+        rows, self.buffers['group'] = self.buffers['group'], []
+        if not rows:
+            return
+        existing = set(Group.objects.filter(
+            slug__in={row['slug'] for row in rows}
+        ).values_list('slug', flat=True))
+        groups = {}
+        for row in rows:
+            if row['slug'] not in existing:
+                groups.setdefault(row['slug'], Group(
+                    slug=row['slug'], title=row['title'],
+                    description=row.get('description', '')))
+        with transaction.atomic():
+            Group.objects.bulk_create(groups.values(), ignore_conflicts=True)
+        self.stats['group'] += len(groups)
+
+    def flush_posts(self):
+        rows, self.buffers['post'] = self.buffers['post'], []
+        if not rows:
+            return
+        authors = dict(User.objects.filter(
+            username__in={row['author'] for row in rows}
+        ).values_list('username', 'pk'))
+        groups = dict(Group.objects.filter(
+            slug__in={row['group'] for row in rows if row.get('group')}
+        ).values_list('slug', 'pk'))
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        values = []
+        for row in rows:
+            author_id = authors.get(row['author'])
+            if author_id is None:
+                self.stats['skipped'] += 1
+                continue
+            group_id = groups.get(row.get('group'))
+            pub_date = row.get('pub_date')
+            values.append((
+                row['text'],
+                adapt(parse_datetime(pub_date) if pub_date else now),
+                author_id,
+                group_id,
+                *self.post_defaults,
+            ))
+            self.authors.add(author_id)
+            if group_id is not None:
+                self.groups.add(group_id)
+        # Каждая пачка - своя транзакция: индекс поиска пополняется
+        # одним запросом на пачку, а не триггером на каждую строку
+        with search.triggers_suspended(), connection.cursor() as cursor:
+            cursor.executemany(self.insert_post_sql, values)
+            self.stats['post'] += max(cursor.rowcount, 0)
+
+    @cached_property
+    def default_post_fields(self):
+        # Поля, которых нет в выгрузке (картинка, счётчики): значения по
+        # умолчанию, колонки NOT NULL
+        return [
+            field for field in Post._meta.concrete_fields
+            if not field.primary_key and field.name not in IMPORTED_FIELDS
+        ]
+
+    @cached_property
+    def post_defaults(self):
+        return tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in self.default_post_fields
+        )
+
+    @cached_property
+    def insert_post_sql(self):
+        # Прямой INSERT пачкой: bulk_create тратит больше времени на
+        # подготовку значений полей, чем база на саму вставку
+        opts = Post._meta
+        columns = [
+            *(opts.get_field(name).column for name in IMPORTED_FIELDS),
+            *(field.column for field in self.default_post_fields),
+        ]
+        quote = connection.ops.quote_name
+        return (
+            f'INSERT INTO {quote(opts.db_table)} '
+            f'({", ".join(map(quote, columns))}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})'
+        )
+
+    def finish(self):
+        """Вставка идёт мимо сигналов: счётчики и кеш обновляем сами."""
+        with transaction.atomic():
+            counters.recount_posts(self.authors, self.groups)
+        posts_cache.bump(
+            posts_cache.INDEX,
+            posts_cache.GROUPS,
+            posts_cache.DIRECTORY,
+            *map(posts_cache.author_scope, self.authors),
+            *map(posts_cache.group_scope, self.groups),
+        )
+
+    def report(self, read, started, final=False):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        message = (f'Прочитано строк: {read} за {elapsed:.1f} с '
+                   f'({read / elapsed:.0f} строк/с)')
+        if not final:
+            self.stderr.write(message)
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{message}; пользователей: {self.stats["user"]}, '
+            f'групп: {self.stats["group"]}, постов: {self.stats["post"]}, '
+            f'пропущено постов без автора: {self.stats["skipped"]}'
+        ))
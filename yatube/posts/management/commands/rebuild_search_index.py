@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов (SQLite FTS5)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if not search.is_supported(connections[options['database']]):
+            raise CommandError('Индекс FTS5 есть только на SQLite')
+        search.ensure_index(options['database'], rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,111 @@
+"""Кеш целых страниц лент и постов для анонимных читателей.
+
+Попадание в кеш отдаёт ответ до сессий, аутентификации и CSRF. Ключ
+строится из пути и строки запроса. Вместе со страницей хранятся версии
+её областей (см. posts.cache), которые view записывает в
+request.page_scopes; при чтении версии сравниваются с текущими, так что
+новый или изменённый пост сразу делает страницу устаревшей. Запросы с
+кукой сессии или закрепления за основной базой идут мимо кеша.
+"""
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from core.routers import PRIMARY_COOKIE
+
+from . import cache as posts_cache
+
+# Куки, при которых страница может отличаться от анонимной
+PERSONAL_COOKIES = (PRIMARY_COOKIE, 'messages')
+
+
+def _page_key(request):
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{digest}'
+
+
+class AnonymousPageCacheMiddleware:
+    """Ставить перед SessionMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.cacheable_request(request):
+            return self.get_response(request)
+        key = _page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            versions = posts_cache.get_versions(*entry['scopes'])
+            if versions == entry['versions']:
+                return self.cached_response(request, entry)
+        response = self.get_response(request)
+        entry = self.make_entry(request, response)
+        if entry is not None:
+            cache.set(key, entry, settings.POSTS_PAGE_CACHE_TIMEOUT)
+        return response
+
+    async def __acall__(self, request):
+        if not self.cacheable_request(request):
+            return await self.get_response(request)
+        key = _page_key(request)
+        entry = await cache.aget(key)
+        if entry is not None:
+            versions = await posts_cache.aget_versions(*entry['scopes'])
+            if versions == entry['versions']:
+                return self.cached_response(request, entry)
+        response = await self.get_response(request)
+        entry = self.make_entry(request, response)
+        if entry is not None:
+            await cache.aset(key, entry, settings.POSTS_PAGE_CACHE_TIMEOUT)
+        return response
+
+    def cacheable_request(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        cookies = (settings.SESSION_COOKIE_NAME, *PERSONAL_COOKIES)
+        return not any(name in request.COOKIES for name in cookies)
+
+    def make_entry(self, request, response):
+        scopes = getattr(request, 'page_scopes', None)
+        if (scopes is None or request.method != 'GET'
+                or response.status_code != 200 or response.streaming
+                or response.cookies or response.has_header('Set-Cookie')):
+            return None
+        return {
+            'scopes': scopes,
+            # Версии до рендера: правка во время рендера не останется
+            # незамеченной
+            'versions': request.page_versions,
+            'content': response.content,
+            'headers': list(response.items()),
+        }
+
+    def cached_response(self, request, entry):
+        headers = dict(entry['headers'])
+        # Метрикам нужно имя маршрута, как без кеша
+        request.resolver_match = resolve(request.path_info)
+        response = get_conditional_response(
+            request, etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')),
+        )
+        if response is None:
+            response = HttpResponse(entry['content'])
+            for name, value in entry['headers']:
+                response[name] = value
+        response['X-Page-Cache'] = 'hit'
+        return response
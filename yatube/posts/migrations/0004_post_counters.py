@@ -0,0 +1,45 @@
+# Generated by Django 2.2.19 on 2026-10-18 10:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    totals = Post.objects.order_by().values('group_id').annotate(
+        total=models.Count('pk'))
+    for row in totals.exclude(group_id=None):
+        Group.objects.filter(pk=row['group_id']).update(
+            posts_count=row['total'])
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author_id'], posts_count=row['total'])
+        for row in Post.objects.order_by().values('author_id').annotate(
+            total=models.Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0003_post_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
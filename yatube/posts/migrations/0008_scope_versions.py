@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_comments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScopeVersion',
+            fields=[
+                ('scope', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+                ('changed', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:52
+
+from django.db import migrations
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_scope_versions'),
+    ]
+
+    # Колонка та же: меняется только класс поля, таблицу не пересоздаём
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='comments_count',
+                    field=posts.models.CounterField(default=0, editable=False, verbose_name='Число комментариев'),
+                ),
+            ],
+        ),
+    ]
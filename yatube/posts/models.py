@@ -1,18 +1,50 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from .thumbnails import content_hash
 
 User = get_user_model()
 
 
 
+class CounterField(models.PositiveIntegerField):
+    """Счётчик, который меняют только атомарные UPDATE из posts.counters.
+
+    При сохранении существующего объекта колонка записывается сама в
+    себя, так что устаревшее значение в памяти не затирает счётчик.
+    """
+
+    def pre_save(self, model_instance, add):
+        if add:
+            return super().pre_save(model_instance, add)
+        return F(self.attname)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=50)
     slug = models.SlugField(unique = True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # posts_count меняют только атомарные UPDATE из posts.counters,
+        # сохранение группы не должно затирать его устаревшим значением
+        if self.pk is not None and not self._state.adding and (
+                kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'posts_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -34,14 +66,172 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
     )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True,
+        width_field='image_width',
+        height_field='image_height'
+    )
+    # Размеры картинки читаются один раз при загрузке, шаблоны считают
+    # по ним размеры миниатюр, не открывая файл
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    # Хеш содержимого: ключ миниатюр в posts.thumbnails
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    comments_count = CounterField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Индексы под ленты: главная, группа и профиль сортируются по дате
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Новый файл ещё не сохранён в хранилище: считаем хеш, пока он
+        # во временном файле загрузки
+        self._image_changed = bool(self.image) and not self.image._committed
+        if self._image_changed:
+            self.image_hash = content_hash(self.image)
+        elif not self.image:
+            self.image_hash = ''
+        super().save(*args, **kwargs)
 
 
+class Comment(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    text = models.TextField(
+        'Текст комментария',
+        help_text='Введите текст комментария'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created', '-id')
+        # Страницы комментариев поста листаются по ключу (created, id)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
 
-# Create your models here.
+class AuthorStats(models.Model):
+    """Хранимые счётчики автора, чтобы не считать его посты на лету."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self'
+            ),
+        ]
+        # Подписчики автора для раскладки поста по лентам
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, записанный при публикации (posts.timeline)."""
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Копия Post.pub_date: лента читается одним проходом по индексу
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['owner', '-pub_date', '-post'],
+                name='timeline_owner_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.owner}: {self.post_id}'
+
+
+class ScopeVersion(models.Model):
+    """Версия области кеша лент (posts.cache), общая для всех процессов."""
+    scope = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+    changed = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.scope}={self.version}'
@@ -0,0 +1,232 @@
+import base64
+import binascii
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+# Один фоновый поток на процесс: пересчёт числа записей не срочный
+_count_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='posts-count')
+
+
+def encode_cursor(direction, pub_date, pk):
+    """Упаковывает позицию (pub_date, id) в непрозрачную строку."""
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор; для битого или пустого курсора вернёт None."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def _position(row, date_field='pub_date'):
+    if isinstance(row, dict):
+        return row[date_field], row['id']
+    return getattr(row, date_field), row.pk
+
+
+def keyset_slice(queryset, position, limit, id_field='id',
+                 date_field='pub_date'):
+    """Первые limit строк после позиции курсора в порядке обхода."""
+    if position is None:
+        return queryset.order_by(f'-{date_field}', f'-{id_field}')[:limit]
+    direction, date, pk = position
+    if direction == FORWARD:
+        return queryset.filter(
+            Q(**{f'{date_field}__lt': date})
+            | Q(**{date_field: date, f'{id_field}__lt': pk})
+        ).order_by(f'-{date_field}', f'-{id_field}')[:limit]
+    return queryset.filter(
+        Q(**{f'{date_field}__gt': date})
+        | Q(**{date_field: date, f'{id_field}__gt': pk})
+    ).order_by(date_field, id_field)[:limit]
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (pub_date, id).
+
+    В отличие от Paginator не делает COUNT(*) и OFFSET: каждая страница
+    это один запрос с LIMIT по индексу, поэтому глубокие страницы стоят
+    столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_field = date_field
+
+    def page_queryset(self, position):
+        """Запрос страницы после позиции; берёт на одну строку больше."""
+        return keyset_slice(
+            self.object_list, position, self.per_page + 1,
+            date_field=self.date_field)
+
+    def get_page(self, cursor):
+        return CursorPage(self, decode_cursor(cursor))
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, paginator, position):
+        self.paginator = paginator
+        self.position = position
+
+    @cached_property
+    def _window(self):
+        """Строки страницы и признак того, что за ней есть ещё записи."""
+        limit = self.paginator.per_page
+        rows = list(self.paginator.page_queryset(self.position))
+        window = rows[:limit]
+        if self.position is not None and self.position[0] == BACKWARD:
+            window.reverse()
+        return window, len(rows) > limit
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        if self.position is not None and self.position[0] == BACKWARD:
+            return True
+        return self._window[1]
+
+    def has_previous(self):
+        if self.position is None:
+            return False
+        if self.position[0] == FORWARD:
+            return True
+        return self._window[1]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return encode_cursor(FORWARD, *_position(
+            self.object_list[-1], self.paginator.date_field))
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return encode_cursor(BACKWARD, *_position(
+            self.object_list[0], self.paginator.date_field))
+
+
+def _store_count(key, compute):
+    value = compute()
+    fresh_until = time.time() + settings.POSTS_COUNT_CACHE_TIMEOUT
+    cache.set(key, (value, fresh_until),
+              timeout=settings.POSTS_COUNT_CACHE_TIMEOUT * 10)
+    return value
+
+
+def _refresh_in_background(key, compute):
+    try:
+        _store_count(key, compute)
+    except Exception:
+        logger.exception('Не удалось пересчитать %s', key)
+    finally:
+        cache.delete(f'{key}:refreshing')
+        connections.close_all()
+
+
+def _schedule_refresh(key, compute):
+    if connection.in_atomic_block:
+        # Соединение фонового потока не видит данных открытой транзакции
+        _store_count(key, compute)
+    elif cache.add(f'{key}:refreshing', True,
+                   timeout=settings.POSTS_COUNT_CACHE_TIMEOUT):
+        _count_executor.submit(_refresh_in_background, key, compute)
+
+
+def cached_count(key, compute, estimate=None):
+    """Число записей из кеша; устаревшее значение обновляется в фоне.
+
+    Пока в кеше ничего нет, возвращается дешёвая оценка estimate(),
+    а точный COUNT(*) считается в фоне. Без оценки первый запрос
+    считает сам.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until <= time.time():
+            _schedule_refresh(key, compute)
+        return value
+    if estimate is not None and not connection.in_atomic_block:
+        _schedule_refresh(key, compute)
+        return estimate()
+    return _store_count(key, compute)
+
+
+class WindowedPage(Page):
+    def page_window(self):
+        """Номера страниц вокруг текущей, а не весь page_range."""
+        size = self.paginator.window
+        first = max(1, self.number - size)
+        last = min(self.paginator.num_pages, self.number + size)
+        return range(first, last + 1)
+
+
+class WindowedPaginator(Paginator):
+    """Paginator с окном номеров страниц и кешированным числом записей.
+
+    count_key включает кеширование COUNT(*) на POSTS_COUNT_CACHE_TIMEOUT
+    секунд, count_estimate даёт оценку, пока точного числа ещё нет.
+    """
+
+    window = 3
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_estimate=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_estimate = count_estimate
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return cached_count(
+            self.count_key, self.object_list.count, self.count_estimate)
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
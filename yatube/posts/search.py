@@ -0,0 +1,141 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite текст постов индексируется виртуальной таблицей FTS5
+posts_post_fts с внешним содержимым (content='posts_post'). Таблицу
+синхронизируют триггеры на posts_post, поэтому индекс не отстаёт даже
+при bulk_create и queryset.update. На других СУБД поиск сводится к
+icontains.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+MAX_TERMS = 10
+
+_TRIGGERS = {
+    'posts_post_fts_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    'posts_post_fts_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+    """,
+    'posts_post_fts_au': f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def _existing(cursor, kind, names):
+    placeholders = ', '.join(['%s'] * len(names))
+    cursor.execute(
+        f'SELECT name FROM sqlite_master WHERE type = %s '
+        f'AND name IN ({placeholders})',
+        [kind, *names]
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_index(using='default', rebuild=False):
+    """Создаёт таблицу FTS5 и триггеры, если их нет.
+
+    SQLite пересоздаёт posts_post при части миграций и теряет триггеры,
+    поэтому функция вызывается после каждого migrate. Если чего-то
+    не хватало, индекс перестраивается по posts_post целиком.
+    """
+    connection = connections[using]
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        missing = not _existing(cursor, 'table', [FTS_TABLE]) or (
+            len(_existing(cursor, 'trigger', list(_TRIGGERS))) < len(_TRIGGERS))
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"text, content='posts_post', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        for sql in _TRIGGERS.values():
+            cursor.execute(sql)
+        if missing or rebuild:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return missing or rebuild
+
+
+@contextmanager
+def triggers_suspended(using='default'):
+    """Пачка вставок в posts_post без построчных триггеров.
+
+    Триггеры удаляются, а после вставки новые строки (id больше
+    прежнего максимума) попадают в индекс одним INSERT ... SELECT, и
+    триггеры создаются снова. Всё идёт одной транзакцией пачки: откат
+    возвращает триггеры вместе с индексом, а блокировка записи
+    держится только на время пачки. Внутри допустимы только вставки.
+    """
+    connection = connections[using]
+    if not is_supported(connection):
+        with transaction.atomic(using=using):
+            yield
+        return
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM posts_post')
+        last_id = cursor.fetchone()[0]
+        for name in _TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        yield
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM posts_post WHERE id > %s', [last_id])
+        for sql in _TRIGGERS.values():
+            cursor.execute(sql)
+
+
+def _terms(query):
+    return re.findall(r'\w+', query)[:MAX_TERMS]
+
+
+def match_expression(terms):
+    """Слова запроса в синтаксисе FTS5: поиск по префиксу, через И."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_posts(queryset, query):
+    """Посты, подходящие под запрос, от самых релевантных."""
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+    if not is_supported(connections[queryset.db]):
+        for term in terms:
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+    match = match_expression(terms)
+    table = queryset.model._meta.db_table
+    # Совпадения берутся из индекса одним подзапросом; rank для каждой
+    # строки FTS5 находит по rowid, не перебирая весь индекс
+    matched = RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,))
+    rank = RawSQL(
+        f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'AND rowid = {table}.id', (match,), output_field=FloatField())
+    return queryset.filter(pk__in=matched).annotate(
+        search_rank=rank).order_by('search_rank', '-pub_date')
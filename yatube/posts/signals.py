@@ -0,0 +1,165 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete)
+from django.dispatch import receiver
+
+from . import cache as posts_cache
+from . import counters, lookups, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+@receiver(post_init, sender=Post)
+def remember_initial_relations(sender, instance, **kwargs):
+    """Запоминает группу и автора, чтобы заметить перенос поста."""
+    instance._initial_group_id = instance.group_id
+    instance._initial_author_id = instance.author_id
+
+
+def _post_scopes(post):
+    scopes = [
+        posts_cache.INDEX,
+        posts_cache.author_scope(post.author_id),
+        posts_cache.post_scope(post.pk),
+    ]
+    for group_id in {post.group_id, post._initial_group_id}:
+        if group_id is not None:
+            scopes.append(posts_cache.group_scope(group_id))
+    if post._initial_author_id not in (None, post.author_id):
+        scopes.append(posts_cache.author_scope(post._initial_author_id))
+    return scopes
+
+
+def _directory_changed(post, created):
+    # Каталогу групп важны только появление поста и смена группы
+    return created or post.group_id != post._initial_group_id
+
+
+def _update_counters(post, created):
+    if created:
+        counters.change_author_count(post.author_id, 1)
+        counters.change_group_count(post.group_id, 1)
+        return
+    if post.author_id != post._initial_author_id:
+        counters.change_author_count(post._initial_author_id, -1)
+        counters.change_author_count(post.author_id, 1)
+    if post.group_id != post._initial_group_id:
+        counters.change_group_count(post._initial_group_id, -1)
+        counters.change_group_count(post.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    _update_counters(instance, created)
+    if created:
+        timeline.publish(instance)
+    elif instance.author_id != instance._initial_author_id:
+        # Пост сменил автора: он уходит из лент подписчиков прежнего
+        TimelineEntry.objects.filter(post=instance).delete()
+        timeline.publish(instance)
+    if getattr(instance, '_image_changed', False):
+        # Миниатюры готовит пул процессов, запрос автора их не ждёт
+        transaction.on_commit(lambda: thumbnails.schedule_all(instance))
+    scopes = _post_scopes(instance)
+    if _directory_changed(instance, created):
+        scopes.append(posts_cache.DIRECTORY)
+    posts_cache.bump(*scopes)
+    instance._initial_group_id = instance.group_id
+    instance._initial_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_author_count(instance.author_id, -1)
+    counters.change_group_count(instance.group_id, -1)
+    posts_cache.bump(*_post_scopes(instance), posts_cache.DIRECTORY)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # По прежнему slug запись найдётся через id, по новому - промах
+    lookups.invalidate('group', key=instance.slug, pk=instance.pk)
+    posts_cache.bump(posts_cache.GROUPS, posts_cache.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    counters.change_followers_count(instance.author_id, 1)
+    timeline.backfill(instance.user_id, instance.author_id)
+    # На странице автора число подписчиков и кнопка подписки
+    posts_cache.bump(posts_cache.author_scope(instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_followers_count(instance.author_id, -1)
+    timeline.forget(instance.user_id, instance.author_id)
+    timeline.follower_lost(instance.author_id)
+    posts_cache.bump(posts_cache.author_scope(instance.author_id))
+
+
+def _deleted_with(origin, model):
+    # origin - объект или QuerySet, с которого началось удаление
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+def _commented_posts_changed(post_ids):
+    # Области постов по id, без загрузки самих постов
+    posts = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'author_id', 'group_id')
+    scopes = [posts_cache.INDEX]
+    for post_id, author_id, group_id in posts:
+        scopes += [posts_cache.post_scope(post_id),
+                   posts_cache.author_scope(author_id)]
+        if group_id is not None:
+            scopes.append(posts_cache.group_scope(group_id))
+    posts_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    counters.change_comments_count(instance.post_id, 1)
+    # Число комментариев видно и в лентах, где есть пост; сам пост view
+    # уже загрузил
+    posts_cache.bump(*_post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    # Каскад от поста или пользователя: пост удалён целиком, а чужие
+    # посты пересчитывает user_deleted одним запросом
+    if _deleted_with(origin, Post) or _deleted_with(origin, User):
+        return
+    counters.change_comments_count(instance.post_id, -1)
+    _commented_posts_changed([instance.post_id])
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Комментарии пользователя к чужим постам исчезнут каскадом
+    instance._commented_post_ids = list(Comment.objects.filter(
+        author=instance).exclude(post__author=instance).values_list(
+        'post_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    lookups.invalidate('user', key=instance.username, pk=instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_commented_post_ids', None)
+    if post_ids:
+        counters.recount_comments(post_ids)
+        _commented_posts_changed(post_ids)
@@ -0,0 +1,13 @@
+from django import template
+
+from ..thumbnails import get_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(post, size):
+    """{% thumbnail post 'list' as thumb %}: url, width и height."""
+    if not post.image:
+        return None
+    return get_thumbnail(post, size)
@@ -0,0 +1,12 @@
+"""Адреса сайта, в которых ленты и пост обслуживают posts.async_views."""
+from django.urls import include, path
+
+from .. import async_views
+from ..urls import app_name, build_urlpatterns
+
+urlpatterns = [
+    path('', include((build_urlpatterns(async_views), app_name))),
+    path('auth/', include('users.urls')),
+    path('auth/', include('django.contrib.auth.urls')),
+    path('about/', include('about.urls', namespace='about')),
+]
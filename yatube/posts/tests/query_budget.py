@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# Общий кеш (сессии, версии posts.lookups) в проде - redis, а не база:
+# в тестах один процесс, и его заменяет locmem, чтобы запросы к таблице
+# кеша не попадали в счёт
+SHARED_IN_MEMORY = {
+    **settings.CACHES,
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, budget, connection):
+        self.test_case = test_case
+        self.budget = budget
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        queries = '\n'.join(
+            f'{i}. {query["sql"]}'
+            for i, query in enumerate(self.captured_queries, start=1)
+        )
+        self.test_case.assertLessEqual(
+            executed, self.budget,
+            f'{executed} запросов к БД при бюджете {self.budget}:\n{queries}'
+        )
+
+
+class QueryBudgetMixin:
+    """Проверка, что код укладывается в бюджет SQL-запросов.
+
+    В отличие от assertNumQueries падает только при превышении
+    бюджета, а не при любом изменении числа запросов.
+    """
+
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        return _AssertMaxQueriesContext(self, budget, connections[using])
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class PostApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for i in range(25):
+            Post.objects.create(
+                author=cls.user, text=f'Тестовый пост {i}', group=cls.group)
+        cls.post = Post.objects.create(
+            author=cls.user, text='Последний пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_every_listing_has_count(self):
+        """У всех лент API в count число постов"""
+        for url in (reverse('posts:api_posts'),
+                    reverse('posts:api_group_posts', args=['test-slug']),
+                    reverse('posts:api_profile_posts', args=['egor'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).json()['count'], 26)
+
+    def test_list_is_paginated_by_cursor(self):
+        """Лента API листается курсором без повторов"""
+        url = reverse('posts:api_group_posts', args=[self.group.slug])
+        first = self.guest_client.get(url).json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertEqual(first['count'], 26)
+        self.assertEqual(first['results'][0], {
+            'id': self.post.id,
+            'text': 'Последний пост',
+            'pub_date': first['results'][0]['pub_date'],
+            'author': 'egor',
+            'group': 'test-slug',
+        })
+        second = self.guest_client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 6)
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 26)
+
+    def test_repeat_poll_gets_304_without_listing_query(self):
+        """Повторный опрос получает 304 без выборки постов"""
+        url = reverse('posts:api_posts')
+        etag = self.guest_client.get(url)['ETag']
+        # Только последний пост и версии областей для валидатора
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_validators_skip_database(self):
+        """Деталь поста отвечает 304 по версиям, правка меняет ETag"""
+        url = reverse('posts:api_post_detail', args=[self.post.id])
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['text'], 'Последний пост')
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['text'], 'Исправленный пост')
+
+    def test_delete_changes_last_modified(self):
+        """Удаление старого поста меняет Last-Modified ленты"""
+        url = reverse('posts:api_posts')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        later = timezone.now() + timedelta(minutes=1)
+        with mock.patch('posts.cache.timezone.now', return_value=later):
+            Post.objects.filter(text='Тестовый пост 0').get().delete()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
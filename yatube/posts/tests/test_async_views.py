@@ -0,0 +1,77 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='posts.tests.async_urls')
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.async_client = AsyncClient()
+        self.templates_pages_names = {
+            reverse('posts:index'): 'posts/index.html',
+            reverse('posts:group_posts', args=[self.group.slug]):
+                'posts/group_list.html',
+            reverse('posts:profile', args=[self.user.username]):
+                'posts/profile.html',
+            reverse('posts:post_detail', args=[self.post.id]):
+                'posts/post_detail.html',
+        }
+
+    def test_read_views_are_async(self):
+        """Ленты и пост обслуживают корутины"""
+        for url in self.templates_pages_names:
+            with self.subTest(url=url):
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(resolve(url).func))
+
+    async def test_pages_use_correct_template(self):
+        """Асинхронные view рендерят те же шаблоны и отдают 304"""
+        for url, template in self.templates_pages_names.items():
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertTemplateUsed(response, template)
+                self.assertContains(response, 'Тестовый пост')
+                again = await self.async_client.get(
+                    url, headers={'If-None-Match': response['ETag']})
+                self.assertEqual(again.status_code, 304)
+
+    async def test_profile_context(self):
+        """В профиль передаются автор и число его постов"""
+        response = await self.async_client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertEqual(response.context['author'], self.user)
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertEqual(
+            list(response.context['page_obj'].object_list), [self.post])
+
+    async def test_missing_objects_are_not_found(self):
+        """Несуществующие группа, автор и пост дают 404"""
+        urls = (
+            reverse('posts:group_posts', args=['no-such-group']),
+            reverse('posts:profile', args=['nobody']),
+            reverse('posts:post_detail', args=[self.post.id + 100]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 404)
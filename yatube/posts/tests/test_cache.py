@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cache as posts_cache
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_index_fragment_is_cached(self):
+        """Лента берётся из кеша, пока версия не изменилась"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        # bulk_create не шлёт сигналы - версия остаётся прежней
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Без сигнала')])
+        self.assertNotContains(self.guest_client.get(url), 'Без сигнала')
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Новый пост')
+
+    def test_post_save_bumps_only_affected_scopes(self):
+        """Сохранение поста меняет версии только своих областей"""
+        scopes = (
+            posts_cache.INDEX,
+            posts_cache.author_scope(self.user.pk),
+            posts_cache.group_scope(self.group.pk),
+            posts_cache.group_scope(self.other_group.pk),
+            posts_cache.GROUPS,
+        )
+        before = posts_cache.get_versions(*scopes)
+        Post.objects.create(author=self.user, text='Пост', group=self.group)
+        after = posts_cache.get_versions(*scopes)
+        changed = [
+            scope for scope, old, new in zip(scopes, before, after)
+            if old != new
+        ]
+        self.assertEqual(changed, list(scopes[:3]))
+
+    def test_versions_do_not_live_in_process_cache(self):
+        """Версии в базе: пустой кеш другого процесса видит те же"""
+        before = posts_cache.get_versions(posts_cache.INDEX)
+        cache.clear()
+        self.assertEqual(posts_cache.get_versions(posts_cache.INDEX), before)
+        posts_cache.bump(posts_cache.INDEX)
+        cache.clear()
+        self.assertGreater(
+            posts_cache.get_versions(posts_cache.INDEX)[0], before[0])
+
+    def test_moving_post_bumps_both_groups(self):
+        """Перенос поста в другую группу сбрасывает обе группы"""
+        old_scope = posts_cache.group_scope(self.group.pk)
+        new_scope = posts_cache.group_scope(self.other_group.pk)
+        before = posts_cache.get_versions(old_scope, new_scope)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        after = posts_cache.get_versions(old_scope, new_scope)
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
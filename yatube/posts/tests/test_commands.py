@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Follow, Group, Post
+from ..search import search_posts
+
+User = get_user_model()
+
+
+@contextmanager
+def open_dump(content):
+    """Временный файл с выгрузкой для import_posts."""
+    handle, path = tempfile.mkstemp(suffix='.jsonl')
+    with os.fdopen(handle, 'w', encoding='utf-8') as dump:
+        dump.write(content)
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+class ExplainListingsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.create(author=cls.user, text='Тестовый пост',
+                            group=cls.group)
+
+    def test_listings_do_not_sort_whole_table(self):
+        """Ни одна лента не сортирует всю таблицу постов"""
+        out = StringIO()
+        call_command('explain_listings', '--fail-on-sort', stdout=out)
+        self.assertIn('post_group_pub_date_idx', out.getvalue())
+        self.assertIn('post_author_pub_date_idx', out.getvalue())
+
+
+class RebuildPostCountersCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    def test_rebuild_repairs_drift(self):
+        """Команда чинит счётчики после загрузки в обход сигналов"""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {i}', group=self.group)
+            for i in range(3)
+        ])
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(self.user.post_stats.posts_count, 3)
+
+    def test_rebuild_creates_missing_stats_once(self):
+        """Автору без счётчика заводится одна строка по постам и подпискам"""
+        readers = [User.objects.create_user(username=f'reader{i}')
+                   for i in range(2)]
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {i}') for i in range(3)])
+        Follow.objects.bulk_create([
+            Follow(user=reader, author=self.user) for reader in readers])
+        Follow.objects.create(user=self.user, author=readers[0])
+        AuthorStats.objects.all().delete()
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertEqual(
+            set(AuthorStats.objects.values_list(
+                'author__username', 'posts_count', 'followers_count')),
+            {('egor', 3, 2), ('reader0', 0, 1)})
+
+
+class ImportExportCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='egor', first_name='Егор', password='secret')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for i in range(5):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}',
+                group=cls.group if i % 2 else None)
+
+    def test_export_import_round_trip(self):
+        """Выгрузка и загрузка переносят данные без изменений"""
+        expected = list(Post.objects.values_list(
+            'author__username', 'group__slug', 'pub_date', 'text'))
+        dump = StringIO()
+        call_command('export_posts', stdout=dump, stderr=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        with open_dump(dump.getvalue()) as path:
+            call_command('import_posts', path, '--batch-size', '2',
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list(Post.objects.values_list(
+            'author__username', 'group__slug', 'pub_date', 'text')),
+            expected)
+        user = User.objects.get(username='egor')
+        self.assertTrue(user.check_password('secret'))
+        self.assertEqual(user.post_stats.posts_count, 5)
+        self.assertEqual(Group.objects.get().posts_count, 2)
+
+    def test_imported_posts_are_searchable(self):
+        """Загруженные посты попадают в поисковый индекс"""
+        line = ('{"model": "post", "author": "egor", "group": null, '
+                '"text": "Загруженный пост", "pub_date": null}\n')
+        with open_dump(line) as path:
+            call_command('import_posts', path,
+                         stdout=StringIO(), stderr=StringIO())
+        found = search_posts(Post.objects.all(), 'загруженный')
+        self.assertEqual([post.text for post in found], ['Загруженный пост'])
+
+
+    def test_failed_import_keeps_search_triggers(self):
+        """Упавшая загрузка оставляет загруженные пачки и триггеры индекса"""
+        lines = ('{"model": "post", "author": "egor", "group": null, '
+                 '"text": "Первый", "pub_date": null}\n'
+                 'не json\n')
+        with open_dump(lines) as path:
+            with self.assertRaises(CommandError):
+                call_command('import_posts', path, '--batch-size', '1',
+                             stdout=StringIO(), stderr=StringIO())
+        # Пачки коммитятся по одной: первая уже в базе и в индексе
+        found = search_posts(Post.objects.all(), 'первый')
+        self.assertEqual([post.text for post in found], ['Первый'])
+        Post.objects.create(author=self.user, text='Уникальный')
+        found = search_posts(Post.objects.all(), 'уникальный')
+        self.assertEqual([post.text for post in found], ['Уникальный'])
+
+    def test_import_recounts_only_touched_rows(self):
+        """Загрузка пересчитывает только затронутых авторов и группы"""
+        other = User.objects.create_user(username='other')
+        Post.objects.filter(author=self.user).update(comments_count=7)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=42)
+        line = ('{"model": "post", "author": "other", "group": null, '
+                '"text": "Загруженный пост", "pub_date": null}\n')
+        with open_dump(line) as path:
+            call_command('import_posts', path,
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(other.post_stats.posts_count, 1)
+        self.assertEqual(
+            set(Post.objects.filter(author=self.user).values_list(
+                'comments_count', flat=True)), {7})
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 42)
+
+    def test_report_counts_only_new_rows(self):
+        """Существующие пользователи и группы не считаются загруженными"""
+        lines = ('{"model": "user", "username": "egor"}\n'
+                 '{"model": "user", "username": "new"}\n'
+                 '{"model": "user", "username": "new"}\n'
+                 '{"model": "group", "slug": "test-slug", "title": "-"}\n')
+        out = StringIO()
+        with open_dump(lines) as path:
+            call_command('import_posts', path, stdout=out, stderr=StringIO())
+        self.assertIn('пользователей: 1, групп: 0, постов: 0',
+                      out.getvalue())
+
+
+class BenchPostsCommandTest(TestCase):
+    def setUp(self):
+        handle, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.output)
+
+    def bench(self, *args):
+        call_command(
+            'bench_posts', '--current-db', '--users=3', '--groups=2',
+            '--posts=30', '--requests=2', '--warmup=0',
+            f'--output={self.output}', *args, stdout=StringIO())
+        with open(self.output, encoding='utf-8') as results:
+            return json.load(results)
+
+    def test_every_route_is_measured(self):
+        """Замеры есть для каждого именованного маршрута posts и users"""
+        routes = self.bench()['routes']
+        for name in ('posts:index', 'posts:post_edit', 'posts:api_posts',
+                     'users:login', 'users:logout'):
+            with self.subTest(name=name):
+                self.assertIn(name, routes)
+        self.assertEqual(routes['posts:post_edit']['status'], 200)
+        self.assertGreater(routes['posts:index']['queries'], 0)
+        self.assertLessEqual(
+            routes['posts:index']['p50_ms'], routes['posts:index']['p99_ms'])
+
+    def test_regression_against_baseline_fails(self):
+        """Рост числа запросов относительно прошлого запуска - ошибка"""
+        baseline = self.bench()
+        baseline['routes']['posts:index']['queries'] = 0
+        with open_dump(json.dumps(baseline)) as path:
+            with self.assertRaisesMessage(CommandError, 'posts:index'):
+                self.bench(f'--baseline={path}')
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Post
+from ..views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.detail_url = reverse('posts:post_detail', args=[self.post.id])
+
+    def add_comments(self, count):
+        for i in range(count):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}')
+
+    def test_add_comment(self):
+        """Комментарий сохраняется и увеличивает счётчик поста"""
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Новый комментарий'})
+        self.assertRedirects(response, self.detail_url)
+        self.assertTrue(Comment.objects.filter(
+            post=self.post, author=self.user, text='Новый комментарий'
+        ).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_guest_cannot_comment(self):
+        """Гость не может комментировать"""
+        self.guest_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Комментарий гостя'})
+        self.assertFalse(Comment.objects.exists())
+
+    def test_detail_shows_first_page(self):
+        """На странице поста только первая страница комментариев"""
+        self.add_comments(COMMENTS_PER_PAGE + 5)
+        response = self.guest_client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, f'Комментарий {COMMENTS_PER_PAGE + 4}')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_loads_next_page(self):
+        """Фрагмент отдаёт следующую страницу по курсору"""
+        self.add_comments(COMMENTS_PER_PAGE + 5)
+        first = self.guest_client.get(self.detail_url).context['comments']
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'cursor': first.next_cursor})
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {i}' for i in range(4, -1, -1)])
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_fragment_of_missing_post_is_404(self):
+        """Фрагмент комментариев несуществующего поста - 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_new_comment_changes_etag(self):
+        """Новый комментарий меняет ETag страницы поста и фрагмента"""
+        for url in (self.detail_url,
+                    reverse('posts:post_comments', args=[self.post.id])):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                self.add_comments(1)
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_listing_uses_stored_count(self):
+        """Ленты показывают хранимое число комментариев"""
+        self.add_comments(3)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 3')
+
+    def test_edit_keeps_comments_count(self):
+        """Сохранение поста не затирает число комментариев"""
+        stale = Post.objects.get(pk=self.post.pk)
+        self.add_comments(2)
+        stale.text = 'Исправленный текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+    def test_delete_and_rebuild(self):
+        """Удаление комментария и пересчёт поддерживают счётчик"""
+        self.add_comments(2)
+        Comment.objects.first().delete()
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        counters.rebuild()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_cascade_skips_per_comment_updates(self):
+        """Удаление поста не обновляет счётчик на каждый комментарий"""
+        self.add_comments(10)
+        post = Post.objects.get(pk=self.post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        self.assertLessEqual(len(queries), 10)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_deleted_user_comments_are_recounted(self):
+        """Удаление пользователя пересчитывает комментарии чужих постов"""
+        reader = User.objects.create_user(username='reader')
+        for i in range(3):
+            Comment.objects.create(
+                post=self.post, author=reader, text=f'Комментарий {i}')
+        self.add_comments(1)
+        reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_save_keeps_default_semantics(self):
+        """save() не подставляет update_fields получателям post_save"""
+        received = []
+
+        def receiver(sender, update_fields, **kwargs):
+            received.append(update_fields)
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        self.post.save()
+        self.assertEqual(received, [None])
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def test_unchanged_page_is_not_modified(self):
+        """Повторный запрос неизменной страницы получает 304"""
+        for url in self.pages:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Cookie', response['Vary'])
+                again = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 304)
+                again = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(again.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        """Правка поста меняет ETag всех страниц, где он выводится"""
+        etags = [self.guest_client.get(url)['ETag'] for url in self.pages]
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url, etag in zip(self.pages, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Исправленный пост')
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag одной страницы"""
+        url = reverse('posts:index')
+        guest = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=guest)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], guest)
+
+    def test_missing_object_is_not_found(self):
+        """Несуществующая группа по-прежнему отдаёт 404"""
+        response = self.guest_client.get(
+            reverse('posts:group_posts', args=['no-such-group']))
+        self.assertEqual(response.status_code, 404)
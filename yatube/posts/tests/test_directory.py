@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..directory import build_directory, group_directory
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class GroupDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Альфа', slug='alpha', description='Первая группа')
+        cls.empty = Group.objects.create(
+            title='Бета', slug='beta', description='Пустая группа')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}',
+                                group=cls.group)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def rows(self):
+        return {row['slug']: row for row in group_directory()}
+
+    def test_directory_counts_and_dates(self):
+        """Каталог считает посты и дату последнего одним запросом"""
+        # Плюс запрос версий областей каталога
+        with self.assertNumQueries(2):
+            rows = self.rows()
+        self.assertEqual(rows['alpha']['total'], 3)
+        self.assertEqual(
+            rows['alpha']['last_pub_date'], self.posts[-1].pub_date)
+        self.assertEqual(rows['beta']['total'], 0)
+        self.assertIsNone(rows['beta']['last_pub_date'])
+
+    def test_directory_uses_stored_counts(self):
+        """Число постов берётся из Group.posts_count, посты не считаются"""
+        Group.objects.filter(pk=self.group.pk).update(posts_count=42)
+        self.assertEqual(
+            {row['slug']: row['total'] for row in build_directory()},
+            {'alpha': 42, 'beta': 0})
+
+    def test_directory_is_cached(self):
+        """Повторный запрос каталога читает из базы только версии"""
+        self.rows()
+        with self.assertNumQueries(1):
+            self.rows()
+
+    def test_post_changes_refresh_directory(self):
+        """Создание, перенос и удаление поста обновляют каталог"""
+        self.rows()
+        post = Post.objects.create(
+            author=self.user, text='Новый', group=self.empty)
+        self.assertEqual(self.rows()['beta']['total'], 1)
+        post.group = self.group
+        post.save()
+        self.assertEqual(self.rows()['alpha']['total'], 4)
+        post.delete()
+        self.assertEqual(self.rows()['alpha']['total'], 3)
+
+    def test_group_rename_refreshes_directory(self):
+        """Переименование группы видно в каталоге"""
+        self.rows()
+        self.empty.title = 'Гамма'
+        self.empty.save()
+        self.assertEqual(self.rows()['beta']['title'], 'Гамма')
+
+    def test_page_lists_groups(self):
+        """Страница каталога выводит группы и число постов"""
+        response = self.guest_client.get(reverse('posts:groups'))
+        self.assertContains(response, reverse(
+            'posts:group_posts', args=[self.group.slug]))
+        self.assertContains(response, 'Постов: 3')
+        self.assertEqual(len(response.context['page_obj']), 2)
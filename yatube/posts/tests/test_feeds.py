@@ -0,0 +1,85 @@
+import json
+from xml.dom import minidom
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост <с разметкой> & амперсандом',
+            group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_feeds_are_valid(self):
+        """Ленты отдаются потоком и корректно разбираются"""
+        urls = {
+            reverse('posts:index_feed', args=['rss']): 'description',
+            reverse('posts:group_feed', args=[self.group.slug, 'atom']):
+                'content',
+            reverse('posts:profile_feed', args=[self.user.username, 'rss']):
+                'description',
+        }
+        for url, tag in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.streaming)
+                document = minidom.parseString(self.content(response))
+                texts = [
+                    node.firstChild.data
+                    for node in document.getElementsByTagName(tag)
+                ]
+                self.assertIn(self.post.text, texts)
+        response = self.guest_client.get(
+            reverse('posts:index_feed', args=['json']))
+        feed = json.loads(self.content(response))
+        self.assertEqual(feed['items'][0]['content_text'], self.post.text)
+
+    def test_unknown_format(self):
+        """Неизвестный формат ленты - 404"""
+        response = self.guest_client.get(
+            reverse('posts:index_feed', args=['yaml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        """Неизменённая лента отдаёт 304, новый пост меняет ETag"""
+        url = reverse('posts:index_feed', args=['rss'])
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    async def test_asgi_feed_streams_asynchronously(self):
+        """Под ASGI лента - асинхронный поток, а не список в памяти"""
+        response = await AsyncClient().get(
+            reverse('posts:index_feed', args=['json']) + '?full=1')
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        feed = json.loads(b''.join(chunks).decode())
+        self.assertEqual(feed['items'][0]['content_text'], self.post.text)
@@ -0,0 +1,188 @@
+import queue
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT_SYNC=True)
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow(self, user, author):
+        return Follow.objects.create(user=user, author=author)
+
+    def publish(self, author, text):
+        # Раскладка ставится на коммит транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, text=text)
+
+    def feed(self, client=None, **params):
+        response = (client or self.authorized_client).get(
+            reverse('posts:follow_index'), params)
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка заполняет ленту и счётчик, отписка их очищает"""
+        self.authorized_client.post(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
+        self.assertEqual(self.feed(), [self.post])
+
+        self.authorized_client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 0)
+
+    def test_cannot_follow_self_or_by_get(self):
+        """Нельзя подписаться на себя или GET-запросом"""
+        self.authorized_client.post(
+            reverse('posts:profile_follow', args=[self.user.username]))
+        response = self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_shows_follow_state(self):
+        """Кнопка подписки на странице автора меняется после подписки"""
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertFalse(self.authorized_client.get(url).context['following'])
+        self.follow(self.user, self.author)
+        response = self.authorized_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['followers_count'], 1)
+
+    def test_new_post_fans_out_to_followers_only(self):
+        """Новый пост попадает только в ленты подписчиков"""
+        self.follow(self.user, self.author)
+        post = self.publish(self.author, 'Новый пост')
+        self.assertEqual(self.feed(), [post, self.post])
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.assertEqual(self.feed(stranger_client), [])
+
+    @override_settings(TIMELINE_BATCH_SIZE=2)
+    def test_fan_out_in_batches(self):
+        """Раскладка записывает всех подписчиков пачками"""
+        followers = [
+            User.objects.create_user(username=f'fan{i}') for i in range(5)]
+        for follower in followers:
+            self.follow(follower, self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(timeline.fan_out(post.pk), 5)
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 5)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_author_is_merged_on_read(self):
+        """Посты автора с большим числом подписчиков читаются при чтении"""
+        self.follow(self.user, self.author)
+        self.follow(self.stranger, self.author)
+        other = User.objects.create_user(username='other')
+        self.follow(self.user, other)
+        own = self.publish(other, 'Пост другого автора')
+        post = self.publish(self.author, 'Популярный пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        # Пост до порога уже разложен, в ленте он не повторяется
+        self.assertEqual(self.feed(), [post, own, self.post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_posts_are_fanned_out_below_limit(self):
+        """Когда подписчиков меньше порога, посты раскладываются в ленты"""
+        self.follow(self.user, self.author)
+        stranger = self.follow(self.stranger, self.author)
+        post = self.publish(self.author, 'Популярный пост')
+        with self.captureOnCommitCallbacks(execute=True):
+            stranger.delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.user, post=post).exists())
+        self.assertEqual(self.feed(), [post, self.post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2, TIMELINE_CATCH_UP=1)
+    def test_catch_up_is_bounded(self):
+        """Догоняются только последние TIMELINE_CATCH_UP постов"""
+        self.follow(self.user, self.author)
+        stranger = self.follow(self.stranger, self.author)
+        older = self.publish(self.author, 'Ранний пост')
+        newer = self.publish(self.author, 'Поздний пост')
+        with self.captureOnCommitCallbacks(execute=True):
+            stranger.delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(owner=self.user).values_list(
+                'post_id', flat=True)) & {older.pk, newer.pk},
+            {newer.pk})
+
+    @override_settings(TIMELINE_FANOUT_SYNC=False)
+    def test_catch_up_never_runs_in_request(self):
+        """При полной очереди догонка ждёт поток, а не идёт в запросе"""
+        full = queue.Queue(maxsize=1)
+        full.put_nowait(0)
+        self.addCleanup(timeline._catch_up.clear)
+        with mock.patch.object(timeline, '_queue', full), \
+                mock.patch.object(timeline, '_ensure_worker'), \
+                mock.patch.object(timeline, 'catch_up') as catch_up:
+            timeline.schedule_catch_up(self.author.pk)
+        catch_up.assert_not_called()
+        self.assertIn(self.author.pk, timeline._catch_up)
+
+    def test_feed_pages_by_cursor(self):
+        """Лента подписок листается курсором"""
+        self.follow(self.user, self.author)
+        for i in range(12):
+            self.publish(self.author, f'Пост {i}')
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        self.assertEqual(len(self.feed(cursor=page.next_cursor)), 3)
+
+
+@override_settings(TIMELINE_FANOUT_SYNC=False)
+class FanOutWorkerTests(TransactionTestCase):
+    def test_worker_fans_out_after_commit(self):
+        """Фоновый поток раскладывает пост после коммита"""
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='writer')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(author=author, text='Пост')
+        timeline.drain()
+        self.assertTrue(
+            TimelineEntry.objects.filter(owner=reader, post=post).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_worker_catches_up_below_limit(self):
+        """После отписки ниже порога посты догоняет фоновый поток"""
+        reader = User.objects.create_user(username='reader')
+        stranger = User.objects.create_user(username='stranger')
+        author = User.objects.create_user(username='writer')
+        Follow.objects.create(user=reader, author=author)
+        follow = Follow.objects.create(user=stranger, author=author)
+        post = Post.objects.create(author=author, text='Популярный пост')
+        timeline.drain()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        follow.delete()
+        timeline.drain()
+        self.assertTrue(
+            TimelineEntry.objects.filter(owner=reader, post=post).exists())
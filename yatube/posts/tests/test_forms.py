@@ -1,8 +1,13 @@
-from django.test import Client, TestCase
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings)
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from http import HTTPStatus
 
+from ..forms import PostForm
 from ..models import Post, Group, User
 User = get_user_model()
 
@@ -58,3 +63,28 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertTrue(Post.objects.filter(text="Измененный пост",group=self.group.id).exists())
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(SQLITE_WRITE_RETRIES=2, SQLITE_WRITE_RETRY_DELAY=0,
+                   TIMELINE_FANOUT_SYNC=True)
+class LockedWriteTests(TransactionTestCase):
+    def test_only_write_is_retried(self):
+        """При занятой базе повторяется запись, а не весь view"""
+        user = User.objects.create_user(username='egor')
+        client = Client()
+        client.force_login(user)
+        save = Post.save
+        attempts = []
+
+        def locked_once(post, *args, **kwargs):
+            attempts.append(post)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return save(post, *args, **kwargs)
+
+        with mock.patch.object(Post, 'save', locked_once), mock.patch(
+                'posts.views.PostForm', wraps=PostForm) as form:
+            client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(len(attempts), 2)
+        form.assert_called_once()
+        self.assertTrue(Post.objects.filter(text='Пост').exists())
@@ -0,0 +1,127 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_image(name='photo.png', size=(2000, 1000), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_SYNC=True,
+                   TIMELINE_FANOUT_SYNC=True)
+class PostImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Пост с картинкой', 'image': image})
+        return Post.objects.latest('pk')
+
+    def test_upload_stores_size_and_hash(self):
+        """Загрузка сохраняет файл, его размеры и хеш содержимого"""
+        post = self.create_post(make_image())
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertEqual((post.image_width, post.image_height), (2000, 1000))
+        self.assertEqual(len(post.image_hash), 64)
+
+    def test_thumbnails_generated_after_upload(self):
+        """После загрузки готовы миниатюры всех размеров"""
+        post = self.create_post(make_image())
+        for size, box in (('list', (960, 540)), ('detail', (1280, 1280))):
+            with self.subTest(size=size):
+                name = thumbnails.thumbnail_name(post.image_hash, box)
+                path = os.path.join(TEMP_MEDIA_ROOT, name)
+                with Image.open(path) as image:
+                    thumb = thumbnails.get_thumbnail(post, size)
+                    self.assertEqual(
+                        image.size, (thumb.width, thumb.height))
+                self.assertTrue(thumb.url.endswith(name))
+
+    def test_listing_gets_thumbnail_size(self):
+        """Лента выводит миниатюру с шириной и высотой"""
+        self.create_post(make_image())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="480"')
+        self.assertContains(response, '/media/thumbs/')
+
+    def test_same_content_shares_thumbnail(self):
+        """Одинаковые картинки используют одну миниатюру"""
+        first = self.create_post(make_image('a.png'))
+        second = self.create_post(make_image('b.png'))
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            thumbnails.get_thumbnail(first, 'list').url,
+            thumbnails.get_thumbnail(second, 'list').url)
+
+    def test_ready_thumbnail_skips_file_check(self):
+        """Готовая миниатюра берётся по отметке, без проверки файла"""
+        post = self.create_post(make_image())
+        with mock.patch.object(
+                thumbnails.default_storage, 'exists') as exists:
+            thumb = thumbnails.get_thumbnail(post, 'list')
+        exists.assert_not_called()
+        self.assertIn('/media/thumbs/', thumb.url)
+
+    def test_failure_is_remembered(self):
+        """Неудачная миниатюра не ставится в очередь на каждом рендере"""
+        with mock.patch.object(
+                thumbnails, 'render_thumbnail',
+                side_effect=OSError('broken')) as render:
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                post = self.create_post(make_image())
+            calls = render.call_count
+            for _ in range(3):
+                thumb = thumbnails.get_thumbnail(post, 'list')
+        self.assertEqual(render.call_count, calls)
+        self.assertEqual(thumb.url, post.image.url)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_SYNC=False,
+                   TIMELINE_FANOUT_SYNC=True)
+class ThumbnailPoolTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='egor')
+
+    def test_process_pool_renders_thumbnail(self):
+        """Миниатюру готовит пул процессов"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image(color='blue'))
+        thumb = thumbnails.get_thumbnail(post, 'detail')
+        self.assertEqual(thumb.url, post.image.url)
+        thumbnails.wait()
+        self.assertNotEqual(
+            thumbnails.get_thumbnail(post, 'detail').url, post.image.url)
@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from .. import counters, lookups
+from ..models import Group, Post
+from .query_budget import SHARED_IN_MEMORY
+
+User = get_user_model()
+
+
+@override_settings(CACHES=SHARED_IN_MEMORY)
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-')
+
+    def setUp(self):
+        caches['shared'].clear()
+        lookups.invalidate_all()
+
+    def test_hits_skip_database(self):
+        """Повторный поиск группы и автора не обращается к базе"""
+        lookups.get_group('test-slug')
+        lookups.get_author('egor')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group('test-slug'), self.group)
+            author = lookups.get_author('egor')
+            self.assertEqual(author, self.user)
+
+    def test_misses_are_cached(self):
+        """Промах запоминается, а создание объекта его сбрасывает"""
+        with self.assertNumQueries(1):
+            self.assertIsNone(lookups.get_group('missing'))
+            self.assertIsNone(lookups.get_group('missing'))
+        group = Group.objects.create(
+            title='Новая', slug='missing', description='-')
+        self.assertEqual(lookups.get_group('missing'), group)
+
+    def test_renamed_slug_is_forgotten(self):
+        """После смены slug группа по старому адресу не находится"""
+        lookups.get_group('test-slug')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIsNone(lookups.get_group('test-slug'))
+        self.assertEqual(lookups.get_group('renamed'), self.group)
+
+    def test_counters_keep_cached_objects(self):
+        """Новый пост не сбрасывает автора и группу, счётчики - из базы"""
+        author = lookups.get_author('egor')
+        group = lookups.get_group('test-slug')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                author=self.user, text='Пост', group=self.group)
+        with self.assertNumQueries(0):
+            self.assertIs(lookups.get_author('egor'), author)
+            self.assertIs(lookups.get_group('test-slug'), group)
+        self.assertEqual(counters.author_counts(author), (1, 0))
+        self.assertEqual(counters.group_posts_count(group), 1)
+
+    def test_change_evicts_only_its_entry(self):
+        """Сохранение одного автора не сбрасывает остальных"""
+        other = User.objects.create_user(username='other')
+        lookups.get_author('egor')
+        lookups.get_author('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.first_name = 'Другой'
+            other.save()
+        with self.assertNumQueries(1):
+            lookups.get_author('egor')
+            self.assertEqual(lookups.get_author('other').first_name, 'Другой')
+
+    @override_settings(POSTS_LOOKUP_SIZE=2)
+    def test_least_recently_used_is_evicted(self):
+        """Сверх размера вытесняется давно не использованная запись"""
+        lookups.get_group('test-slug')
+        lookups.get_group('first')
+        lookups.get_group('test-slug')
+        lookups.get_group('second')
+        with self.assertNumQueries(1):
+            lookups.get_group('test-slug')
+            lookups.get_group('first')
+
+    @override_settings(POSTS_LOOKUP_TTL=0)
+    def test_expired_entry_is_reloaded(self):
+        """Устаревшая по TTL запись читается заново"""
+        lookups.get_group('test-slug')
+        with self.assertNumQueries(1):
+            lookups.get_group('test-slug')
+
+    def test_invalidation_reaches_other_processes(self):
+        """Сброс после коммита очищает кеш другого процесса"""
+        other = lookups.LookupCache('group')
+
+        def load():
+            return Group.objects.filter(slug='test-slug').first()
+
+        other.get_or_load('test-slug', load)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.title = 'Новое название'
+            self.group.save()
+            self.assertIsNot(other.get('test-slug'), lookups.MISSING)
+        self.assertIs(other.get('test-slug'), lookups.MISSING)
+        self.assertEqual(
+            other.get_or_load('test-slug', load).title, 'Новое название')
+
+    def test_new_group_replaces_cached_miss_elsewhere(self):
+        """Созданная группа не остаётся 404 в другом процессе"""
+        other = lookups.LookupCache('group')
+        other.get_or_load('fresh', lambda: None)
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.create(title='Новая', slug='fresh', description='-')
+        self.assertIs(other.get('fresh'), lookups.MISSING)
+
+    def test_missing_profile_is_answered_from_cache(self):
+        """Повторный 404 профиля не ищет пользователя в базе"""
+        self.client.get('/profile/nobody/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/profile/nobody/')
+        self.assertEqual(response.status_code, 404)
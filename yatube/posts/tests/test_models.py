@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
-from ..models import Post, Group
+from ..models import AuthorStats, Post, Group
 
 User = get_user_model()
 
@@ -46,4 +46,51 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value
-                )
\ No newline at end of file
+                )
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание'
+        )
+
+    def counts(self):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        return (
+            AuthorStats.objects.get(author=self.user).posts_count,
+            self.group.posts_count,
+            self.other_group.posts_count,
+        )
+
+    def test_counters_follow_create_move_and_delete(self):
+        """Счётчики меняются при создании, переносе и удалении поста"""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertEqual(self.counts(), (2, 1, 0))
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counts(), (2, 0, 1))
+        post.delete()
+        self.assertEqual(self.counts(), (1, 0, 0))
+
+    def test_group_save_keeps_counter(self):
+        """Сохранение устаревшей группы не затирает счётчик"""
+        stale_group = Group.objects.get(pk=self.group.pk)
+        Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        stale_group.title = 'Новое название'
+        stale_group.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
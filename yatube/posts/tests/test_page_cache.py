@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def test_anonymous_pages_are_cached(self):
+        """Повторный анонимный запрос отдаётся из кеша по одним версиям"""
+        for url in self.pages:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                self.assertNotIn('X-Page-Cache', first)
+                with self.assertNumQueries(1):
+                    second = self.guest_client.get(url)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_query_string_is_part_of_key(self):
+        """Разные страницы ленты кешируются отдельно"""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index') + '?page=2')
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_session_cookie_skips_cache(self):
+        """Авторизованный читатель не получает анонимную страницу"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Новая запись')
+
+    def test_post_changes_invalidate_pages(self):
+        """Новый пост и правка группы делают страницы устаревшими"""
+        for url in self.pages:
+            self.guest_client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.pages:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotIn('X-Page-Cache', response)
+                self.assertContains(response, 'Исправленный пост')
+        self.guest_client.get(self.pages[1])
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.guest_client.get(self.pages[1])
+        self.assertContains(response, 'Новое название')
+
+    def test_conditional_request_on_cached_page(self):
+        """Страница из кеша отвечает 304 на If-None-Match"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
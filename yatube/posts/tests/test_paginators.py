@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, Group
+from ..paginators import CursorPaginator, WindowedPaginator, decode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        # bulk_create ставит почти одинаковые pub_date - проверяем id
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(13)
+        ])
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_pages_follow_each_other(self):
+        """Курсоры обходят всю ленту без пропусков и повторов"""
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        seen = []
+        page = paginator.get_page(None)
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+        self.assertEqual(seen, self.ordered)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertTrue(back.has_next())
+
+    def test_broken_cursor_gives_first_page(self):
+        """Битый курсор не ломает страницу"""
+        self.assertIsNone(decode_cursor('не-курсор'))
+        page = CursorPaginator(Post.objects.all(), 5).get_page('xxx')
+        self.assertEqual(list(page), self.ordered[:5])
+
+    def test_views_use_cursor_from_query_string(self):
+        """Ленты переходят в режим курсора по параметру cursor"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url + '?cursor=')
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 10)
+                response = self.guest_client.get(
+                    url, {'cursor': page_obj.next_cursor})
+                self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(100)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window_is_small(self):
+        """В шаблон попадает окно страниц, а не весь page_range"""
+        paginator = WindowedPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.num_pages, 50)
+        self.assertEqual(list(paginator.get_page(1).page_window()),
+                         [1, 2, 3, 4])
+        self.assertEqual(list(paginator.get_page(25).page_window()),
+                         [22, 23, 24, 25, 26, 27, 28])
+        self.assertEqual(list(paginator.get_page(50).page_window()),
+                         [47, 48, 49, 50])
+
+    def test_count_comes_from_cache(self):
+        """Число записей берётся из кеша, пока оно свежее"""
+        WindowedPaginator(Post.objects.all(), 10, count_key='test').count
+        Post.objects.create(author=self.user, text='Новый пост')
+        with self.assertNumQueries(0):
+            count = WindowedPaginator(
+                Post.objects.all(), 10, count_key='test').count
+        self.assertEqual(count, 100)
+
+    def test_stale_count_is_refreshed(self):
+        """Устаревшее число отдаётся сразу и пересчитывается"""
+        cache.set('test', (5, 0))
+        count = WindowedPaginator(
+            Post.objects.all(), 10, count_key='test').count
+        self.assertEqual(count, 5)
+        self.assertEqual(cache.get('test')[0], 100)
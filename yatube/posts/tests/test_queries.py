@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import lookups, urls
+from ..models import Post, Group
+from .query_budget import SHARED_IN_MEMORY, QueryBudgetMixin
+
+User = get_user_model()
+
+# Бюджет запросов на каждый маршрут posts/urls.py для авторизованного
+# пользователя: сессия и пользователь уже занимают два запроса.
+# Пост тратит ещё один запрос на валидаторы 304, версии областей кеша
+# читаются из базы одним запросом; группу и автора валидаторы и view
+# берут из posts.lookups, бюджет - для пустого кеша, а их счётчики
+# читаются отдельным запросом. Фрагмент
+# комментариев проверяет, что пост существует.
+ROUTE_BUDGETS = {
+    'index': 5,
+    'index_feed': 4,
+    'follow_index': 4,
+    'group_feed': 4,
+    'profile_feed': 4,
+    'group_posts': 5,
+    'groups': 4,
+    'profile': 5,
+    'profile_follow': 2,
+    'profile_unfollow': 2,
+    'search': 4,
+    'post_detail': 6,
+    'post_comments': 5,
+    'add_comment': 2,
+    'post_create': 3,
+    'post_edit': 4,
+    'api_posts': 4,
+    'api_post_detail': 3,
+    'api_group_posts': 4,
+    'api_profile_posts': 4,
+}
+
+
+@override_settings(CACHES=SHARED_IN_MEMORY)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        # Разные авторы и группы, чтобы N+1 был виден в счётчике
+        for i in range(15):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            Post.objects.create(author=author, text=f'Пост {i}', group=group)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+        cls.route_urls = {
+            'index': reverse('posts:index'),
+            'index_feed': reverse('posts:index_feed', args=['rss']),
+            'follow_index': reverse('posts:follow_index'),
+            'group_feed': reverse(
+                'posts:group_feed', args=[cls.group.slug, 'atom']),
+            'profile_feed': reverse(
+                'posts:profile_feed', args=[cls.user.username, 'json']),
+            'groups': reverse('posts:groups'),
+            'group_posts': reverse(
+                'posts:group_posts', kwargs={'slug': cls.group.slug}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.user.username}),
+            'profile_follow': reverse(
+                'posts:profile_follow', args=[cls.user.username]),
+            'profile_unfollow': reverse(
+                'posts:profile_unfollow', args=[cls.user.username]),
+            'search': reverse('posts:search') + '?q=пост',
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.id}),
+            'post_comments': reverse(
+                'posts:post_comments', args=[cls.post.id]),
+            'add_comment': reverse('posts:add_comment', args=[cls.post.id]),
+            'post_create': reverse('posts:post_create'),
+            'post_edit': reverse(
+                'posts:post_edit', kwargs={'post_id': cls.post.id}),
+            'api_posts': reverse('posts:api_posts'),
+            'api_post_detail': reverse(
+                'posts:api_post_detail', args=[cls.post.id]),
+            'api_group_posts': reverse(
+                'posts:api_group_posts', args=[cls.group.slug]),
+            'api_profile_posts': reverse(
+                'posts:api_profile_posts', args=[cls.user.username]),
+        }
+
+    def setUp(self):
+        caches['shared'].clear()
+        lookups.invalidate_all()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        # В режиме YATUBE_SESSIONS=cached первый запрос кладёт
+        # пользователя в общий кеш: бюджет считается для прогретого
+        self.authorized_client.get(reverse('about:author'))
+
+    def test_every_route_has_budget(self):
+        """У каждого маршрута posts/urls.py задан бюджет запросов"""
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(ROUTE_BUDGETS))
+        self.assertEqual(names, set(self.route_urls))
+
+    def test_routes_fit_query_budget(self):
+        """Страницы не выходят за бюджет SQL-запросов"""
+        for name, url in self.route_urls.items():
+            with self.subTest(name=name):
+                with self.assertMaxQueries(ROUTE_BUDGETS[name]):
+                    response = self.authorized_client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import FTS_TABLE, search_posts
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='egor')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Толстой написал роман о войне')
+        cls.other_post = Post.objects.create(
+            author=cls.user, text='Роман, роман и ещё раз роман')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_search_ranks_results(self):
+        """Поиск находит посты по префиксу и ставит релевантные выше"""
+        self.assertEqual(self.search('роман'), [self.other_post, self.post])
+        self.assertEqual(self.search('толст войн'), [self.post])
+        self.assertEqual(self.search('"; DROP'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_bulk_changes(self):
+        """Триггеры держат индекс в актуальном виде"""
+        Post.objects.bulk_create([Post(author=self.user, text='Достоевский')])
+        self.assertEqual(len(self.search('достоевский')), 1)
+        Post.objects.filter(pk=self.post.pk).update(text='Чехов')
+        self.assertEqual(self.search('чехов'), [self.post])
+        self.assertEqual(self.search('толстой'), [])
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.search('чехов'), [])
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'толстой'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс FTS5"""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'толстой'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post])
+
+    def test_rebuild_command_restores_index(self):
+        """Команда перестраивает индекс по таблице постов"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                           f"VALUES ('delete-all')")
+        self.assertEqual(self.search('толстой'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('толстой'), [self.post])
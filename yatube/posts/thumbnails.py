@@ -0,0 +1,172 @@
+"""Миниатюры картинок постов, которые готовит пул процессов.
+
+Имя миниатюры строится из хеша содержимого картинки и размера, так
+что одинаковые картинки разных постов используют одни и те же файлы,
+а готовый файл и есть кеш. Пока миниатюры нет, шаблон получает
+оригинал и ставит её в очередь пула; когда она готова, версии лент
+поста сбрасываются и фрагменты перерисовываются уже с миниатюрой.
+Ширина и высота считаются по image_width и image_height поста, без
+открытия файлов.
+
+Готовность миниатюры запоминается в кеше: файл проверяется, только
+если отметки нет. Неудача тоже запоминается на
+POSTS_THUMBNAIL_FAILURE_TIMEOUT, чтобы каждый рендер ленты не ставил
+сломанную картинку в очередь заново.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections
+
+from . import cache as posts_cache
+from .imaging import fit, render_thumbnail
+
+logger = logging.getLogger(__name__)
+
+Thumbnail = namedtuple('Thumbnail', 'url width height')
+
+READY = 'ready'
+FAILED = 'failed'
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+# Сигналит wait(), что колбэк миниатюры отработал
+_done = threading.Condition(_lock)
+
+
+def content_hash(file):
+    """sha256 содержимого файла; файл читается кусками."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def thumbnail_name(digest, box):
+    return f'thumbs/{digest[:2]}/{digest}_{box[0]}x{box[1]}.jpg'
+
+
+def _state_key(name):
+    return f'posts:thumbnail:{name}'
+
+
+def _remember(name, error=None):
+    if error is None:
+        cache.set(_state_key(name), READY, timeout=None)
+        return
+    logger.error('Не удалось сделать миниатюру %s: %r', name, error)
+    cache.set(_state_key(name), FAILED,
+              timeout=settings.POSTS_THUMBNAIL_FAILURE_TIMEOUT)
+
+
+def _post_scopes(post):
+    scopes = [
+        posts_cache.INDEX,
+        posts_cache.author_scope(post.author_id),
+        posts_cache.post_scope(post.pk),
+    ]
+    if post.group_id is not None:
+        scopes.append(posts_cache.group_scope(post.group_id))
+    return scopes
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: fork процесса с потоками и открытыми подключениями
+        # к базе небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _finished(name, scopes, caller, future):
+    error = future.exception()
+    try:
+        _remember(name, error)
+        if error is None:
+            posts_cache.bump(*scopes)
+    except DatabaseError:
+        logger.exception('Не удалось сбросить ленты миниатюры %s', name)
+    finally:
+        if threading.get_ident() != caller:
+            # Колбэк идёт в служебном потоке пула: его подключение не
+            # закроет ни один запрос
+            connections.close_all()
+        with _lock:
+            _pending.pop(name, None)
+            _done.notify_all()
+
+
+def schedule(post, box):
+    """Ставит миниатюру картинки поста в очередь пула процессов."""
+    name = thumbnail_name(post.image_hash, box)
+    args = (post.image.path, default_storage.path(name), box,
+            settings.POSTS_THUMBNAIL_QUALITY)
+    if settings.POSTS_THUMBNAIL_SYNC:
+        try:
+            render_thumbnail(*args)
+        except Exception as error:
+            _remember(name, error)
+        else:
+            _remember(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        future = _get_executor().submit(render_thumbnail, *args)
+        _pending[name] = future
+    # Уже готовая задача вызовет колбэк сразу, в потоке запроса
+    future.add_done_callback(partial(
+        _finished, name, _post_scopes(post), threading.get_ident()))
+
+
+def schedule_all(post):
+    """Все размеры миниатюр для новой картинки поста."""
+    for box in settings.POSTS_THUMBNAIL_SIZES.values():
+        schedule(post, box)
+
+
+def wait():
+    """Ждёт миниатюры, которые сейчас готовит пул, вместе с колбэками."""
+    with _lock:
+        _done.wait_for(lambda: not _pending)
+
+
+def _state(name):
+    state = cache.get(_state_key(name))
+    if state is not None:
+        return state
+    with _lock:
+        if name in _pending:
+            return None
+    # Отметки нет (вытеснена или миниатюру делал другой процесс):
+    # один раз смотрим на файл
+    if default_storage.exists(name):
+        cache.set(_state_key(name), READY, timeout=None)
+        return READY
+    return None
+
+
+def get_thumbnail(post, size):
+    """Адрес и размеры миниатюры; без готовой миниатюры - оригинал."""
+    box = settings.POSTS_THUMBNAIL_SIZES[size]
+    width, height = fit(post.image_width, post.image_height, box)
+    name = thumbnail_name(post.image_hash, box)
+    state = _state(name)
+    if state == READY:
+        return Thumbnail(default_storage.url(name), width, height)
+    if state is None:
+        schedule(post, box)
+    return Thumbnail(post.image.url, width, height)
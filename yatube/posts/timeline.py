@@ -0,0 +1,230 @@
+"""Лента подписок: раскладка постов по лентам подписчиков при записи.
+
+Новый пост после коммита уходит в ограниченную очередь, а фоновый
+поток записывает его в TimelineEntry подписчиков пачками по
+TIMELINE_BATCH_SIZE строк. Если очередь полна, раскладку делает сам
+публикующий запрос: автор ждёт дольше, но записи не теряются. Читатель
+получает страницу ленты одним проходом по индексу (owner, pub_date).
+
+У авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+раскладка стоила бы слишком дорого: их посты не раскладываются, а
+подмешиваются при чтении запросом по индексу постов автора. Когда
+подписчиков снова становится меньше порога, фоновый поток раскладывает
+последние TIMELINE_CATCH_UP постов, которые так и не попали в ленты;
+запрос отписки только ставит автора в очередь.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import BACKWARD, CursorPaginator, keyset_slice
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=settings.TIMELINE_QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+# Авторы, чьи посты нужно догнать; в очереди для них только сигнал None,
+# поэтому полная очередь их не теряет
+_catch_up = set()
+_catch_up_lock = threading.Lock()
+
+
+def is_pulled(author_id):
+    """Посты автора подмешиваются при чтении, а не раскладываются."""
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def pulled_authors(owner):
+    """id авторов из подписок owner, чьи посты читаются при чтении ленты."""
+    return Follow.objects.filter(
+        user=owner,
+        author__post_stats__followers_count__gte=(
+            settings.TIMELINE_FANOUT_LIMIT)
+    ).values_list('author_id', flat=True)
+
+
+def fan_out(post_id):
+    """Раскладывает пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date').first()
+    if post is None or is_pulled(post['author_id']):
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post['author_id']).order_by('user_id').values_list(
+        'user_id', flat=True)
+    written = 0
+    last_id = 0
+    while True:
+        batch = list(followers.filter(
+            user_id__gt=last_id)[:settings.TIMELINE_BATCH_SIZE])
+        if not batch:
+            return written
+        # Каждая пачка - отдельная короткая запись, база не блокируется
+        # на всё время раскладки
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(owner_id=owner_id, post_id=post_id,
+                           pub_date=post['pub_date'])
+             for owner_id in batch),
+            ignore_conflicts=True
+        )
+        written += len(batch)
+        last_id = batch[-1]
+
+
+def _work():
+    while True:
+        post_id = _queue.get()
+        try:
+            if post_id is not None:
+                fan_out(post_id)
+        except Exception:
+            logger.exception('Не удалось разложить пост %s', post_id)
+        try:
+            _run_catch_ups()
+        finally:
+            if _queue.empty():
+                connections.close_all()
+            _queue.task_done()
+
+
+def _run_catch_ups():
+    while True:
+        with _catch_up_lock:
+            if not _catch_up:
+                return
+            author_id = _catch_up.pop()
+        try:
+            catch_up(author_id)
+        except Exception:
+            logger.exception('Не удалось догнать ленты автора %s', author_id)
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_work, name='posts-fanout', daemon=True)
+            _worker.start()
+
+
+def schedule_fan_out(post_id):
+    if settings.TIMELINE_FANOUT_SYNC:
+        fan_out(post_id)
+        return
+    _ensure_worker()
+    try:
+        _queue.put_nowait(post_id)
+    except queue.Full:
+        fan_out(post_id)
+
+
+def publish(post):
+    """Ставит раскладку нового поста после коммита транзакции."""
+    transaction.on_commit(lambda: schedule_fan_out(post.pk))
+
+
+def drain():
+    """Ждёт, пока фоновый поток разложит все посты из очереди."""
+    _queue.join()
+
+
+def backfill(owner_id, author_id):
+    """Последние посты автора в ленту нового подписчика."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(owner_id=owner_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        ignore_conflicts=True
+    )
+
+
+def catch_up(author_id):
+    """Раскладывает последние посты автора, которых нет ни в одной ленте.
+
+    Такие посты публиковались, пока автор был выше порога; пока он
+    ниже, их больше никто не подмешает при чтении. Работа ограничена
+    TIMELINE_CATCH_UP постами.
+    """
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).exclude(
+        Exists(TimelineEntry.objects.filter(post=OuterRef('pk'))))
+    for post_id in list(posts.values_list(
+            'pk', flat=True)[:settings.TIMELINE_CATCH_UP]):
+        fan_out(post_id)
+
+
+def schedule_catch_up(author_id):
+    """Ставит догонку автора фоновому потоку; в запросе она не идёт."""
+    if settings.TIMELINE_FANOUT_SYNC:
+        catch_up(author_id)
+        return
+    with _catch_up_lock:
+        _catch_up.add(author_id)
+    _ensure_worker()
+    try:
+        _queue.put_nowait(None)
+    except queue.Full:
+        # Поток занят очередью и заберёт автора после текущего поста
+        pass
+
+
+def follower_lost(author_id):
+    """После отписки: автор опустился ниже порога - догоняем ленты."""
+    crossed = AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT - 1
+    ).exists()
+    if crossed:
+        transaction.on_commit(lambda: schedule_catch_up(author_id))
+
+
+def forget(owner_id, author_id):
+    """Убирает посты автора из ленты отписавшегося."""
+    TimelineEntry.objects.filter(
+        owner_id=owner_id, post__author_id=author_id).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Страницы ленты подписок по курсору (pub_date, id).
+
+    Разложенные посты выбираются по индексу ленты, посты авторов с
+    раскладкой при чтении - по индексу постов автора; обе выборки
+    ограничены размером страницы и сливаются в памяти.
+    """
+
+    def __init__(self, owner, per_page):
+        super().__init__(
+            Post.objects.select_related('author', 'group'), per_page)
+        self.owner = owner
+
+    def page_queryset(self, position):
+        limit = self.per_page + 1
+        entries = keyset_slice(
+            TimelineEntry.objects.filter(owner=self.owner).values('post_id'),
+            position, limit, id_field='post_id')
+        posts = list(keyset_slice(
+            self.object_list.filter(pk__in=entries), position, limit))
+        authors = list(pulled_authors(self.owner))
+        if not authors:
+            return posts
+        posts += keyset_slice(
+            self.object_list.filter(author__in=authors), position, limit)
+        unique = {post.pk: post for post in posts}.values()
+        backward = position is not None and position[0] == BACKWARD
+        return sorted(
+            unique, key=lambda post: (post.pub_date, post.pk),
+            reverse=not backward)[:limit]
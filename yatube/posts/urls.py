@@ -1,12 +1,46 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, feeds, views
 
 app_name = 'posts'
-urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug:slug>/', views.group_posts, name='group_posts'),
-    path('profile/<str:username>/', views.profile, name='profile'),
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
-    path('posts/create/', views.post_create, name='post_create'),
-    path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit')
-]
+
+
+def build_urlpatterns(read_views):
+    """Маршруты приложения; ленты и пост обслуживает модуль read_views."""
+    return [
+        path('', read_views.index, name='index'),
+        path('feed/<str:fmt>/', feeds.index_feed, name='index_feed'),
+        path('follow/', views.follow_index, name='follow_index'),
+        path('groups/', views.groups, name='groups'),
+        path('group/<slug:slug>/', read_views.group_posts,
+             name='group_posts'),
+        path('group/<slug:slug>/feed/<str:fmt>/', feeds.group_feed,
+             name='group_feed'),
+        path('profile/<str:username>/', read_views.profile, name='profile'),
+        path('profile/<str:username>/feed/<str:fmt>/', feeds.profile_feed,
+             name='profile_feed'),
+        path('profile/<str:username>/follow/', views.profile_follow,
+             name='profile_follow'),
+        path('profile/<str:username>/unfollow/', views.profile_unfollow,
+             name='profile_unfollow'),
+        path('search/', views.search, name='search'),
+        path('posts/<int:post_id>/', read_views.post_detail,
+             name='post_detail'),
+        path('posts/<int:post_id>/comments/', views.post_comments,
+             name='post_comments'),
+        path('posts/<int:post_id>/comment/', views.add_comment,
+             name='add_comment'),
+        path('posts/create/', views.post_create, name='post_create'),
+        path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+        path('api/v1/posts/', api.post_list, name='api_posts'),
+        path('api/v1/posts/<int:post_id>/', api.post_detail,
+             name='api_post_detail'),
+        path('api/v1/groups/<slug:slug>/posts/', api.group_post_list,
+             name='api_group_posts'),
+        path('api/v1/profiles/<str:username>/posts/', api.profile_post_list,
+             name='api_profile_posts'),
+    ]
+
+
+urlpatterns = build_urlpatterns(
+    async_views if settings.POSTS_ASYNC_VIEWS else views)
@@ -1,59 +1,229 @@
-from django.core.paginator import Paginator
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User
-from .forms import PostForm
+from django.views.decorators.http import require_POST, require_safe
+from core.db import retry_on_lock
+from .models import Comment, Follow, Post
+from . import cache as posts_cache
+from . import lookups
+from .conditional import (
+    comments_validators, conditional_page, directory_validators,
+    group_validators, index_validators, post_detail_validators,
+    profile_validators)
+from .counters import (
+    INDEX_COUNT_KEY, author_counts, author_posts_count, estimate_posts_total,
+    group_posts_count)
+from .directory import group_directory
+from .forms import CommentForm, PostForm
+from .paginators import CursorPaginator, WindowedPaginator
+from .search import search_posts
+from .timeline import TimelinePaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+GROUPS_PER_PAGE = 50
+
 
-def paginator_func(post_list,request):
-    paginator = Paginator(post_list, 10)
+def paginator_func(post_list,request,count=None,**count_options):
+    """Страница постов: по номеру или по курсору (?cursor=...).
+
+    Уже известное число постов можно передать в count, тогда
+    Paginator не будет делать ещё один COUNT(*); иначе число можно
+    кешировать через count_key и count_estimate (см. WindowedPaginator).
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is not None or settings.POSTS_PAGINATION == 'cursor':
+        return CursorPaginator(post_list, POSTS_PER_PAGE).get_page(cursor)
+    paginator = WindowedPaginator(post_list, POSTS_PER_PAGE, **count_options)
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def comments_page(post_id, cursor=None):
+    """Страница комментариев поста вместе с авторами, по курсору."""
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    return CursorPaginator(
+        comments, COMMENTS_PER_PAGE, date_field='created').get_page(cursor)
+
+
+def follow_context(request, author, followers_count):
+    """Число подписчиков автора и подписан ли на него текущий пользователь."""
+    user = request.user
+    following = (
+        user.is_authenticated and user != author
+        and Follow.objects.filter(user=user, author=author).exists()
+    )
+    return {
+        'following': following,
+        'followers_count': followers_count,
+    }
+
+
+def fragment_context(request, *scopes):
+    """Ключ и время жизни кеша отрендеренной ленты."""
+    return {
+        'fragment_key': posts_cache.fragment_key(request, *scopes),
+        'fragment_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
+    }
+
+
+@conditional_page(index_validators)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     context = {
-        'page_obj': paginator_func(post_list,request=request)
+        'page_obj': paginator_func(
+            post_list,request=request,count_key=INDEX_COUNT_KEY,
+            count_estimate=estimate_posts_total),
+        **fragment_context(request, posts_cache.INDEX, posts_cache.GROUPS),
     }
     return render(request, template, context)
+
+
+@conditional_page(group_validators)
 def group_posts(request,slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = lookups.get_group_or_404(slug)
+    posts = group.posts.select_related('author', 'group')
     context = {
         'group': group,
-        'page_obj': paginator_func(post_list=posts,request=request)
+        'page_obj': paginator_func(
+            post_list=posts,request=request,count=group_posts_count(group)),
+        **fragment_context(request, posts_cache.group_scope(group.pk)),
     }
     return render(request, template, context)
 
+@conditional_page(directory_validators)
+def groups(request):
+    template_name = 'posts/groups.html'
+    # Валидаторы уже прочитали версии каталога, второй раз не читаем
+    directory = group_directory(getattr(request, 'page_versions', None))
+    paginator = WindowedPaginator(directory, GROUPS_PER_PAGE)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, template_name, context)
+
+
+@conditional_page(profile_validators)
 def profile(request, username):
     template_name = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = lookups.get_author_or_404(username)
+    posts = author.posts.select_related('author', 'group')
+    posts_count, followers_count = author_counts(author)
     context = {
         'author': author,
-        'page_obj': paginator_func(post_list=posts,request=request),
+        'posts_count': posts_count,
+        **follow_context(request, author, followers_count),
+        'page_obj': paginator_func(
+            post_list=posts,request=request,count=posts_count),
+        **fragment_context(
+            request, posts_cache.author_scope(author.pk), posts_cache.GROUPS),
+    }
+    return render(request, template_name, context)
+
+
+def search(request):
+    template_name = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(
+        Post.objects.select_related('author', 'group'), query)
+    paginator = WindowedPaginator(posts, POSTS_PER_PAGE)
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+        'page_obj': paginator.get_page(request.GET.get('page')),
     }
     return render(request, template_name, context)
 
 
+@conditional_page(post_detail_validators)
 def post_detail(request, post_id):
     template_name = 'posts/post_detail.html'
+    post = get_object_or_404(
+        Post.objects.select_related('author__post_stats', 'group'),
+        pk=post_id
+    )
+    context = {
+        'post': post,
+        'posts_count': author_posts_count(post.author),
+        'comments': comments_page(post.pk),
+        'comment_form': CommentForm(),
+    }
+    return render(request, template_name, context)
+
+
+@require_safe
+@conditional_page(comments_validators)
+def post_comments(request, post_id):
+    """Следующие страницы комментариев: фрагмент без шапки и подвала.
+
+    Что пост существует, проверяет comments_validators.
+    """
+    template_name = 'posts/includes/comments.html'
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request.GET.get('cursor')),
+    }
+    return render(request, template_name, context)
+
+
+@login_required
+@require_POST
+def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
+    form = CommentForm(request.POST)
+    if form.is_valid():
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        retry_on_lock(comment.save)()
+    return redirect('posts:post_detail', post_id)
+
+@login_required
+def follow_index(request):
+    template_name = 'posts/follow.html'
+    paginator = TimelinePaginator(request.user, POSTS_PER_PAGE)
     context = {
-        'post': post
+        'page_obj': paginator.get_page(request.GET.get('cursor')),
     }
     return render(request, template_name, context)
 
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = lookups.get_author_or_404(username)
+    if author != request.user:
+        retry_on_lock(Follow.objects.get_or_create)(
+            user=request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = lookups.get_author_or_404(username)
+    follow = Follow.objects.filter(user=request.user, author=author).first()
+    if follow is not None:
+        # delete() у объекта, чтобы сработал сигнал post_delete
+        retry_on_lock(follow.delete)()
+    return redirect('posts:profile', username)
+
+
 @login_required
 def post_create(request):
     template_name = 'posts/post_create.html'
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == 'POST' and form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        retry_on_lock(new_post.save)()
         return redirect('posts:profile',new_post.author)
     contex = {
         'form': form
@@ -63,7 +233,7 @@ def post_create(request):
 @login_required
 def post_edit(request,post_id):
     template_name = 'posts/post_create.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post.id)
     form = PostForm(
@@ -72,7 +242,7 @@ def post_edit(request,post_id):
         instance=post
         )
     if form.is_valid():
-        form.save()
+        retry_on_lock(form.save)()
         return redirect('posts:post_detail', post.id)
     context = {
         'form' : form,
@@ -0,0 +1,45 @@
+"""Аутентификация с кешем пользователя для режима YATUBE_SESSIONS=cached.
+
+Пользователь запроса берётся из кеша USER_CACHE_ALIAS на
+USER_CACHE_TIMEOUT секунд. Кеш должен быть общим для всех процессов
+(см. users.checks), иначе сброс увидит только свой процесс. Кеш
+сбрасывают после коммита сохранение и удаление пользователя (смена
+пароля тоже сохраняет его) и выход из аккаунта, см. users.signals.
+Изменения через QuerySet.update() сигналов не шлют и видны только по
+истечении времени.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def forget_user(user_id, using=None):
+    """Сбрасывает пользователя из кеша после коммита транзакции.
+
+    Откат не сбрасывает кеш, а читатель, успевший до коммита положить
+    старую строку, не переживёт сброса.
+    """
+    transaction.on_commit(
+        lambda: user_cache().delete(user_cache_key(user_id)), using=using)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cache = user_cache()
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,37 @@
+"""Проверки настроек режима YATUBE_SESSIONS=cached."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+CACHED_BACKEND = 'users.backends.CachedModelBackend'
+CACHED_SESSIONS = 'django.contrib.sessions.backends.cached_db'
+
+# У каждого процесса своя копия: сброс в другом воркере сюда не дойдёт
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def _cache_aliases():
+    aliases = set()
+    if settings.SESSION_ENGINE == CACHED_SESSIONS:
+        aliases.add(settings.SESSION_CACHE_ALIAS)
+    if CACHED_BACKEND in settings.AUTHENTICATION_BACKENDS:
+        aliases.add(settings.USER_CACHE_ALIAS)
+    return sorted(aliases)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Сессии и пользователи из кеша требуют общего для процессов кеша."""
+    errors = []
+    for alias in _cache_aliases():
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend is None or backend in PROCESS_LOCAL_CACHES:
+            errors.append(Error(
+                f'Кеш {alias!r} не общий для процессов: выход, смена '
+                f'пароля и блокировка не дойдут до других воркеров',
+                hint='Укажите YATUBE_SHARED_CACHE=db или redis',
+                id='users.E001',
+            ))
+    return errors
@@ -1,3 +1,111 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import user_cache_key
+from .checks import check_shared_cache
+
+User = get_user_model()
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+# В тестах один процесс, поэтому общий кеш заменяет locmem
+CACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'SESSION_CACHE_ALIAS': 'shared',
+    'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+    'CACHES': {
+        'default': {'BACKEND': LOCMEM, 'LOCATION': 'users-default'},
+        'shared': {'BACKEND': LOCMEM, 'LOCATION': 'users-shared'},
+    },
+}
+
+
+@override_settings(**CACHED_AUTH)
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='egor', password='old-secret-1')
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        """Сессия и пользователь читаются из кеша"""
+        self.authorized_client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(self.url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_user_save_invalidates_cache(self):
+        """Изменённый пользователь не берётся из кеша"""
+        self.authorized_client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Егор'
+            self.user.save()
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.context['user'].first_name, 'Егор')
+
+    def test_password_change_logs_out_other_sessions(self):
+        """После смены пароля старая сессия не проходит проверку"""
+        other_client = Client()
+        other_client.force_login(self.user)
+        other_client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('users:password_change_form'), {
+                    'old_password': 'old-secret-1',
+                    'new_password1': 'new-secret-2',
+                    'new_password2': 'new-secret-2',
+                })
+        response = other_client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_logout_forgets_user(self):
+        """Выход из аккаунта сбрасывает кеш пользователя"""
+        self.authorized_client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.get(reverse('users:logout'))
+        response = self.authorized_client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_rolled_back_save_keeps_cache(self):
+        """Откаченное сохранение не сбрасывает кеш, сброс - после коммита"""
+        self.authorized_client.get(self.url)
+        key = user_cache_key(self.user.pk)
+        try:
+            with transaction.atomic():
+                self.user.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNotNone(caches['shared'].get(key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+            self.assertIsNotNone(caches['shared'].get(key))
+        self.assertIsNone(caches['shared'].get(key))
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_rejected(self):
+        """Кеш сессий и пользователей в locmem - ошибка проверки"""
+        caches_settings = {**settings.CACHES, 'shared': {'BACKEND': LOCMEM}}
+        with override_settings(**{**CACHED_AUTH, 'CACHES': caches_settings}):
+            self.assertEqual(
+                [error.id for error in check_shared_cache(None)],
+                ['users.E001'])
+
+    def test_shared_cache_passes(self):
+        """Общий кеш и обычные сессии проверку проходят"""
+        self.assertEqual(check_shared_cache(None), [])
+        shared = {**CACHED_AUTH['CACHES'], 'shared': settings.CACHES['shared']}
+        with override_settings(**{**CACHED_AUTH, 'CACHES': shared}):
+            self.assertEqual(check_shared_cache(None), [])
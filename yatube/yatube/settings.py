@@ -49,6 +49,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.static.StaticFilesMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.routers.PrimaryStickinessMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,7 +67,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для Server-Timing
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 
 # Database
@@ -90,6 +97,85 @@ DATABASES = {
     }
 }
 
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# Реплики только для чтения: YATUBE_REPLICAS=2 добавляет replica1 и
+# replica2 - копии db.sqlite3, которые обновляет команда sync_replicas.
+# Читают с них ленты и посты, пишут всегда в default (core.routers)
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает только основную базу
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Бэкенд выбирается переменной окружения YATUBE_CACHE: locmem или file.
+# shared - кеш, общий для всех процессов и серверов (YATUBE_SHARED_CACHE:
+# db - таблица manage.py createcachetable, или redis по YATUBE_REDIS_URL).
+# На нём сессии и пользователь запроса в режиме YATUBE_SESSIONS=cached и
+# версии кеша поиска posts.lookups: сброс в locmem виден только своему
+# процессу (см. users.checks и posts.checks)
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+    'shared': CACHE_BACKENDS[os.environ.get('YATUBE_SHARED_CACHE', 'db')],
+}
+
+# Сколько секунд живут отрендеренные фрагменты лент
+POSTS_FRAGMENT_CACHE_TIMEOUT = 60 * 5
+
+# Сессии и пользователь запроса: YATUBE_SESSIONS=db (по умолчанию) или
+# cached - сессии cached_db и пользователь из кеша (users.backends).
+# ModelBackend остаётся вторым, чтобы старые сессии не разлогинило
+if os.environ.get('YATUBE_SESSIONS', 'db') == 'cached':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'shared'
+    AUTHENTICATION_BACKENDS = [
+        'users.backends.CachedModelBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+
+# Сколько секунд и в каком кеше живёт пользователь запроса
+USER_CACHE_TIMEOUT = 60
+USER_CACHE_ALIAS = 'shared'
+
+# Сколько секунд хранятся целые страницы для анонимных читателей
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Сколько секунд число постов в ленте считается свежим
+POSTS_COUNT_CACHE_TIMEOUT = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -119,18 +205,118 @@ TIME_ZONE = 'UTC'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 
+# Сжатие ответов (core.compression): уровни gzip 1-9 и brotli 0-11 и
+# минимальный размер ответа, который имеет смысл сжимать
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_MIN_SIZE = 512
+# Защита от BREACH: к заголовку gzip добавляется имя файла случайной
+# длины до стольких байт, как в GZipMiddleware
+COMPRESSION_MAX_RANDOM_BYTES = 100
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# Сюда collectstatic собирает файлы с хешем в имени и их сжатые копии
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage'
+            if DEBUG else 'core.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки сразу пишутся во временный файл кусками, а не копятся в памяти
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Миниатюры картинок постов (posts.thumbnails): рамки по размерам
+# для лент и страницы поста, качество JPEG и число процессов пула.
+# POSTS_THUMBNAIL_SYNC готовит миниатюры прямо в запросе
+POSTS_THUMBNAIL_SIZES = {
+    'list': (960, 540),
+    'detail': (1280, 1280),
+}
+POSTS_THUMBNAIL_QUALITY = 85
+POSTS_THUMBNAIL_WORKERS = 2
+POSTS_THUMBNAIL_SYNC = False
+# Сколько секунд не повторять миниатюру, которую не удалось сделать
+POSTS_THUMBNAIL_FAILURE_TIMEOUT = 60 * 5
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+
+# Режим пагинации лент: 'page' (номера страниц) или 'cursor' (по ключу)
+POSTS_PAGINATION = 'page'
+
+# Асинхронные view для чтения лент и постов (posts.async_views);
+# включаются под ASGI, см. yatube/asgi.py
+POSTS_ASYNC_VIEWS = os.environ.get('YATUBE_ASYNC_VIEWS') == '1'
+
+# Профиль SQLite выбирается переменной окружения YATUBE_SQLITE_PROFILE:
+# default - как есть, production - WAL, настроенные PRAGMA и постоянные
+# подключения для конкурентной нагрузки
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # Отрицательное значение - размер кеша страниц в КиБ
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+SQLITE_PROFILE = os.environ.get('YATUBE_SQLITE_PROFILE', 'default')
+# Применяются к каждому новому подключению, см. core.db
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+if SQLITE_PROFILE == 'production':
+    # Под ASGI у каждого запроса свой поток, и постоянные подключения
+    # копились бы, поэтому там они не включаются
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0 if POSTS_ASYNC_VIEWS else 600
+        database['CONN_HEALTH_CHECKS'] = True
+
+# Сколько раз повторять запись, если база занята, и начальная пауза (с)
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_RETRY_DELAY = 0.05
+
+# Лента подписок (posts.timeline): размер очереди раскладки, строк в
+# одной пачке записи, порог подписчиков, после которого посты автора
+# подмешиваются при чтении, сколько постов получает новый подписчик и
+# сколько постов догоняется, когда автор опускается ниже порога.
+# TIMELINE_FANOUT_SYNC раскладывает посты прямо в запросе
+TIMELINE_QUEUE_SIZE = 1000
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL = 50
+TIMELINE_CATCH_UP = 1000
+TIMELINE_FANOUT_SYNC = False
+
+# Сколько секунд хранится каталог групп; устаревает он раньше по версиям
+POSTS_DIRECTORY_TIMEOUT = 60 * 60
+
+# Кеш поиска групп и авторов в памяти процесса (posts.lookups): число
+# записей, сколько секунд живут найденные объекты и промахи, и общий
+# для процессов кеш, где лежат версии записей
+POSTS_LOOKUP_SIZE = 1024
+POSTS_LOOKUP_TTL = 60
+POSTS_LOOKUP_NEGATIVE_TTL = 10
+POSTS_LOOKUP_CACHE_ALIAS = 'shared'
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include,path
 
@@ -7,5 +9,10 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('', include('core.urls', namespace='core')),
     path('post/', include('posts.urls', namespace='posts'))
 ]
+
+if settings.DEBUG:
+    # В продакшене /media/ отдаёт веб-сервер
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)